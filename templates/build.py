@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Incremental Template Build
+Rebuilds only the templates whose inputs changed since the last run.
+
+Each catalog entry is keyed by a hash of its builder's source, its parameters
+and the installed python-docx version, plus today's date for entries whose
+output embeds the build date. The keys are recorded in a build index
+next to the artifacts, so an up-to-date template is reused instead of rebuilt.
+Specs in specs/ that no catalog entry builds are added to the catalog automatically.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_INDEX = ".build_index.json"
+
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+SPEC_DIR = os.path.join(BASE_DIR, "specs")
+
+# Every template the templates/ directory knows how to build. Layouts live in
+# specs/; template.py, generator.py and insurance_template.py build from them.
+# A builder must return a python-docx Document or an object with save_document().
+CATALOG = [
+    {
+        "name": "insurance_template",
+        "spec": os.path.join(SPEC_DIR, "conditional_policy.json"),
+        "params": {"company_name": "Your Insurance Company Name"},
+        "output": "insurance_template.docx",
+    },
+    {
+        "name": "insurance_policy_template",
+        "spec": os.path.join(SPEC_DIR, "acme_policy.json"),
+        "params": {},
+        "output": "insurance_policy_template.docx",
+    },
+    {
+        "name": "insurance_quote_template",
+        "spec": os.path.join(SPEC_DIR, "quote.json"),
+        "params": {},
+        "output": "Insurance_Quote_Template.docx",
+    },
+    {
+        "name": "enhanced_insurance_quote",
+        "module": "enhance",
+        "builder": "build_sample_quote",
+        "params": {},
+        # add_quote_info stamps the build date into the quote
+        "dated": True,
+        "output": "enhanced_insurance_quote.docx",
+    },
+]
+
+
+def spec_catalog(spec_dir=None):
+    """Return a catalog entry for every spec in spec_dir not already built by CATALOG."""
+    import spec
+
+    cataloged = {os.path.abspath(entry["spec"]) for entry in CATALOG if "spec" in entry}
+    entries = []
+    for path in spec.find_specs(spec_dir or spec.SPEC_DIR):
+        if os.path.abspath(path) in cataloged:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        entries.append({
+            "name": name,
+            "spec": path,
+            "params": {},
+            "output": f"{name}.docx",
+        })
+    return entries
+
+
+def docx_version():
+    """Return the installed python-docx version without importing it."""
+    from importlib import metadata
+
+    try:
+        return metadata.version("python-docx")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def source_hash(*paths):
+    """Hash the contents of the given source files without importing them."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def is_dated(entry):
+    """Return True if an entry's output embeds the date it was built on."""
+    if "spec" in entry:
+        import spec
+
+        return any(op[0] == "date_run" for op in spec.load_plan(entry["spec"]))
+    return entry.get("dated", False)
+
+
+def build_key(entry, docx_ver, minimal=False):
+    """Compute the cache key for a catalog entry, which changes daily for dated entries."""
+    if "spec" in entry:
+        import spec
+
+        sources = [os.path.join(BASE_DIR, "spec.py")] + spec.spec_sources(entry["spec"])
+    else:
+        sources = [os.path.join(BASE_DIR, f"{entry['module']}.py")]
+    # Every artifact goes through the optimizer pass, and optionally minimal.py, on save
+    sources.append(os.path.join(BASE_DIR, "optimize.py"))
+    if minimal:
+        sources.append(os.path.join(BASE_DIR, "minimal.py"))
+    payload = json.dumps({
+        "source": source_hash(*sources),
+        "builder": entry.get("builder"),
+        "params": entry["params"],
+        "docx": docx_ver,
+        "minimal": minimal,
+        "date": datetime.now().strftime("%Y-%m-%d") if is_dated(entry) else None,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_index(output_dir):
+    """Load the build index, returning an empty one if it is missing or corrupt."""
+    path = os.path.join(output_dir, BUILD_INDEX)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(output_dir, index):
+    """Atomically write the build index."""
+    path = os.path.join(output_dir, BUILD_INDEX)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _save_artifact(result, output_path, minimal=False):
+    """Save whatever the builder returned to output_path."""
+    from optimize import save_optimized
+
+    if hasattr(result, "save_document"):
+        result.save_document(output_path, minimal=minimal)
+    else:
+        save_optimized(result, output_path, minimal=minimal)
+
+
+def build_entry(entry, output_path, minimal=False):
+    """Import the builder module and build a single catalog entry."""
+    if "spec" in entry:
+        import spec
+
+        _save_artifact(spec.build_from_spec(entry["spec"], entry["params"]), output_path, minimal)
+        return
+    module = importlib.import_module(entry["module"])
+    builder = getattr(module, entry["builder"])
+    _save_artifact(builder(**entry["params"]), output_path, minimal)
+
+
+def build(output_dir="output", names=None, force=False, catalog=None, minimal=False):
+    """
+    Incrementally build the template catalog.
+
+    Args:
+        output_dir (str): Directory holding the artifacts and the build index
+        names (list): Optional subset of catalog entry names to build
+        force (bool): Rebuild every selected entry regardless of the index
+        catalog (list): Catalog entries to build, defaults to CATALOG plus specs/
+        minimal (bool): Save artifacts on the minimal base package
+
+    Returns:
+        dict: Lists of entry names under 'built', 'reused' and 'failed'
+    """
+    catalog = CATALOG + spec_catalog() if catalog is None else catalog
+    seen = set()
+    for entry in catalog:
+        if entry["name"] in seen:
+            raise ValueError(f"Duplicate catalog entry: {entry['name']}")
+        seen.add(entry["name"])
+
+    os.makedirs(output_dir, exist_ok=True)
+    index = load_index(output_dir)
+    docx_ver = docx_version()
+    result = {"built": [], "reused": [], "failed": []}
+
+    for entry in catalog:
+        if names and entry["name"] not in names:
+            continue
+
+        output_path = os.path.join(output_dir, entry["output"])
+        key = build_key(entry, docx_ver, minimal)
+        recorded = index.get(entry["name"], {})
+        if not force and recorded.get("key") == key and os.path.exists(output_path):
+            result["reused"].append(entry["name"])
+            continue
+
+        try:
+            build_entry(entry, output_path, minimal)
+        except Exception as e:
+            print(f"Error building {entry['name']}: {str(e)}")
+            result["failed"].append(entry["name"])
+            continue
+
+        index[entry["name"]] = {"key": key, "output": entry["output"]}
+        result["built"].append(entry["name"])
+
+    if result["built"]:
+        save_index(output_dir, index)
+    return result
+
+
+def publish_store(output_dir, store_path):
+    """
+    Publish every artifact recorded in the build index into a shared template store.
+
+    Artifacts are published with their parts stored uncompressed. Nothing is
+    published when the store already holds exactly these artifacts.
+
+    Returns:
+        int: The generation published, or None if the store was up to date
+    """
+    from template_store import TemplateStore, publish, stored_package
+
+    templates = {}
+    for name, record in load_index(output_dir).items():
+        artifact = os.path.join(output_dir, record["output"])
+        if os.path.exists(artifact):
+            with open(artifact, "rb") as f:
+                templates[name] = stored_package(f.read())
+
+    try:
+        with TemplateStore(store_path) as store:
+            current = store.names() == sorted(templates) and all(
+                store.digest(name) == hashlib.sha256(data).hexdigest() for name, data in templates.items()
+            )
+    except (OSError, ValueError, struct.error):
+        current = False
+    return None if current else publish(store_path, templates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally build the insurance templates.")
+    parser.add_argument("names", nargs="*", help="catalog entries to build (default: all)")
+    parser.add_argument("-o", "--output-dir", default=os.path.join(BASE_DIR, "output"),
+                        help="directory for artifacts and the build index")
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--minimal", action="store_true",
+                        help="strip unused styles, latent styles and the theme from the artifacts")
+    parser.add_argument("--publish", metavar="STORE",
+                        help="publish the artifacts into a shared template store file")
+    args = parser.parse_args(argv)
+
+    result = build(args.output_dir, names=args.names, force=args.force, minimal=args.minimal)
+    for name in result["built"]:
+        print(f"built   {name}")
+    for name in result["reused"]:
+        print(f"reused  {name}")
+    for name in result["failed"]:
+        print(f"failed  {name}")
+    if args.publish:
+        generation = publish_store(args.output_dir, args.publish)
+        if generation is None:
+            print(f"store {args.publish} is up to date")
+        else:
+            print(f"published generation {generation} to {args.publish}")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
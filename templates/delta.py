@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Quote Version Deltas
+Stores reissued quotes as byte-level deltas against their previous version.
+
+A reissued quote usually differs from the previous version in a few premium
+or reference cells, yet every version used to be stored as a complete .docx.
+make_delta() compares two packages part by part: unchanged zip parts are
+referenced, changed XML parts are split into paragraph, table row and table
+blocks and diffed patience-style, anchored on blocks that occur once in both
+versions, so only the changed blocks are kept. A part that is too costly to
+diff is stored whole. apply_delta() rebuilds the newer package from
+the older one. Packages are written deterministically (fixed zip timestamps,
+stable part order and compression, pinned core properties) so unchanged
+parts stay byte-identical and rebuilt versions match what was stored.
+QuoteHistory keeps the versions of each quote as a chain of deltas with a
+full snapshot every keyframe_interval versions.
+
+Delta layout: magic 'PFDL' followed by a zlib stream of
+    manifest length u32, manifest JSON, data blob
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import zipfile
+import zlib
+from io import BytesIO
+
+MAGIC = b'PFDL'
+FORMAT_VERSION = 1
+MANIFEST_LENGTH = struct.Struct('<I')
+
+# Timestamp written for every zip entry; the earliest date a zip can record
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+# Parts diffed block by block; anything else is stored whole when it changes
+XML_SUFFIXES = ('.xml', '.rels')
+
+# A block starts at every paragraph, table row and table, and ends with it
+BLOCK_EDGE = re.compile(rb'<w:(?:p|tr|tbl)[ >/]|</w:(?:p|tr|tbl)>')
+
+# Matching work allowed per block of the two versions before a part is stored whole
+DIFF_WORK_PER_BLOCK = 32
+
+
+def check_reference(reference):
+    """Return a quote reference if it is safe to use as a file or directory name."""
+    if (not isinstance(reference, str) or not reference or reference in ('.', '..')
+            or re.search(r'[\\/\x00]', reference)):
+        raise ValueError(f"Invalid quote reference: {reference!r}")
+    return reference
+
+
+def read_parts(data):
+    """Return the (name, compress_type, bytes) entries of a package, in zip order."""
+    with zipfile.ZipFile(BytesIO(data)) as package:
+        return [(info.filename, info.compress_type, package.read(info)) for info in package.infolist()]
+
+
+def write_parts(parts):
+    """Write (name, compress_type, bytes) entries into a deterministic zip package."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as package:
+        for name, compress_type, content in parts:
+            info = zipfile.ZipInfo(name, date_time=ZIP_TIMESTAMP)
+            info.compress_type = compress_type
+            info.external_attr = 0o644 << 16
+            package.writestr(info, content)
+    return buffer.getvalue()
+
+
+def normalize_package(data):
+    """Rewrite a .docx package with fixed zip timestamps and attributes."""
+    return write_parts(read_parts(data))
+
+
+def package_digest(parts):
+    """Hash the names and contents of a package's parts, independent of zip compression."""
+    digest = hashlib.sha256()
+    for name, _, content in parts:
+        encoded = name.encode('utf-8')
+        digest.update(struct.pack('<IQ', len(encoded), len(content)))
+        digest.update(encoded)
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def package_bytes(doc, optimize=True, minimal=False, timestamp=None):
+    """
+    Serialize a python-docx Document deterministically.
+
+    Args:
+        doc: python-docx Document to serialize
+        optimize (bool): Coalesce runs and minify the XML before saving
+        minimal (bool): Strip unused styles and optional parts, see minimal.py
+        timestamp (datetime): Pins the created and modified core properties;
+            by default the ones already in the document are kept
+
+    Returns:
+        bytes: The .docx package
+    """
+    from optimize import save_optimized
+
+    if timestamp is not None:
+        properties = doc.core_properties
+        properties.created = timestamp
+        properties.modified = timestamp
+        properties.last_modified_by = ''
+        properties.revision = 1
+    buffer = BytesIO()
+    save_optimized(doc, buffer, optimize, minimal)
+    return normalize_package(buffer.getvalue())
+
+
+class _DiffTooCostly(Exception):
+    """Raised internally when a part exceeds its diff work budget."""
+
+
+def _blocks(content):
+    """Split an XML part before every paragraph, table row and table, and after each one ends."""
+    edges = {0, len(content)}
+    for match in BLOCK_EDGE.finditer(content):
+        edges.add(match.end() if match.group().startswith(b'</') else match.start())
+    edges = sorted(edges)
+    return [content[start:end] for start, end in zip(edges, edges[1:])]
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    """Return the longest in-order run of (i, j) pairs of blocks that occur once in each range."""
+    in_a, in_b = {}, {}
+    for i in range(alo, ahi):
+        in_a[a[i]] = -1 if a[i] in in_a else i
+    for j in range(blo, bhi):
+        in_b[b[j]] = -1 if b[j] in in_b else j
+    pairs = sorted((i, in_b[block]) for block, i in in_a.items() if i >= 0 and in_b.get(block, -1) >= 0)
+
+    # Longest increasing subsequence of j, by patience sorting
+    tail_j, tail_k, back = [], [], []
+    for k, (_, j) in enumerate(pairs):
+        position = bisect.bisect_left(tail_j, j)
+        back.append(tail_k[position - 1] if position else None)
+        if position == len(tail_j):
+            tail_j.append(j)
+            tail_k.append(k)
+        else:
+            tail_j[position] = j
+            tail_k[position] = k
+    anchors = []
+    k = tail_k[-1] if tail_k else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = back[k]
+    return anchors[::-1]
+
+
+def _match_blocks(a, b, alo, ahi, blo, bhi, matches, budget):
+    """Append the matching (i, j) block pairs of a[alo:ahi] and b[blo:bhi] to matches, in order."""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo, blo = alo + 1, blo + 1
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi, bhi = ahi - 1, bhi - 1
+        tail.append((ahi, bhi))
+
+    if alo < ahi and blo < bhi:
+        budget[0] -= (ahi - alo) + (bhi - blo)
+        if budget[0] < 0:
+            raise _DiffTooCostly()
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            i, j = alo, blo
+            for anchor_i, anchor_j in anchors:
+                _match_blocks(a, b, i, anchor_i, j, anchor_j, matches, budget)
+                matches.append((anchor_i, anchor_j))
+                i, j = anchor_i + 1, anchor_j + 1
+            _match_blocks(a, b, i, ahi, j, bhi, matches, budget)
+    matches.extend(reversed(tail))
+
+
+def _diff_part(base, target, data):
+    """
+    Return the copy/insert ops turning base into target, appending inserted bytes to data.
+
+    Returns None if matching the two versions goes over the work budget.
+    """
+    a, b = _blocks(base), _blocks(target)
+    matches = []
+    try:
+        _match_blocks(a, b, 0, len(a), 0, len(b), matches, [DIFF_WORK_PER_BLOCK * (len(a) + len(b))])
+    except (_DiffTooCostly, RecursionError):
+        return None
+
+    offsets = [0]
+    for block in a:
+        offsets.append(offsets[-1] + len(block))
+    matched = {j: i for i, j in matches}
+
+    ops = []
+    for j, block in enumerate(b):
+        i = matched.get(j)
+        if i is not None:
+            start, end = offsets[i], offsets[i + 1]
+            if ops and ops[-1][0] == 'c' and ops[-1][2] == start:
+                ops[-1][2] = end
+            else:
+                ops.append(['c', start, end])
+        else:
+            if ops and ops[-1][0] == 'i' and ops[-1][1] + ops[-1][2] == len(data):
+                ops[-1][2] += len(block)
+            else:
+                ops.append(['i', len(data), len(block)])
+            data.extend(block)
+    return ops
+
+
+def make_delta(base, target):
+    """
+    Compute the delta that rebuilds the target package from the base package.
+
+    Args:
+        base (bytes): Previous version of the .docx package
+        target (bytes): New version of the .docx package
+
+    Returns:
+        bytes: The encoded delta
+    """
+    base_parts = read_parts(base)
+    base_content = {name: content for name, _, content in base_parts}
+    target_parts = read_parts(target)
+    data = bytearray()
+    entries = []
+    for name, compress_type, content in target_parts:
+        previous = base_content.get(name)
+        if previous == content:
+            entries.append([name, compress_type, None])  # unchanged: copy the whole part
+            continue
+        ops = None
+        if previous is not None and name.endswith(XML_SUFFIXES):
+            ops = _diff_part(previous, content, data)
+        if ops is None:
+            ops = [['i', len(data), len(content)]]
+            data.extend(content)
+        entries.append([name, compress_type, ops])
+
+    manifest = json.dumps({
+        'format': FORMAT_VERSION,
+        'base': package_digest(base_parts),
+        'target': package_digest(target_parts),
+        'entries': entries,
+    }, separators=(',', ':')).encode('utf-8')
+    return MAGIC + zlib.compress(MANIFEST_LENGTH.pack(len(manifest)) + manifest + bytes(data), 9)
+
+
+def _read_delta(delta):
+    if delta[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a quote delta")
+    payload = zlib.decompress(delta[len(MAGIC):])
+    (length,) = MANIFEST_LENGTH.unpack_from(payload, 0)
+    start = MANIFEST_LENGTH.size
+    manifest = json.loads(payload[start:start + length].decode('utf-8'))
+    if manifest['format'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported delta format {manifest['format']}")
+    return manifest, memoryview(payload)[start + length:]
+
+
+def apply_delta(base, delta):
+    """
+    Rebuild the target package of a delta from its base package.
+
+    Raises:
+        ValueError: If the delta was made against a different base, or the
+            rebuilt package does not match the version it was made from
+    """
+    manifest, data = _read_delta(delta)
+    base_parts = read_parts(base)
+    if package_digest(base_parts) != manifest['base']:
+        raise ValueError("Delta does not apply to this base version")
+
+    base_content = {name: content for name, _, content in base_parts}
+    parts = []
+    for name, compress_type, ops in manifest['entries']:
+        if ops is None:
+            content = base_content[name]
+        else:
+            previous = base_content.get(name, b'')
+            content = b''.join(
+                previous[a:b] if op == 'c' else bytes(data[a:a + b])
+                for op, a, b in ops
+            )
+        parts.append((name, compress_type, content))
+
+    if package_digest(parts) != manifest['target']:
+        raise ValueError("Rebuilt package does not match the stored version")
+    return write_parts(parts)
+
+
+class QuoteHistory:
+    """
+    Version history of reissued quotes, stored as deltas.
+
+    Each quote reference gets a directory holding v0001.docx, v0002.delta, ...
+    Every keyframe_interval-th version is stored whole, so rebuilding any
+    version applies at most keyframe_interval - 1 deltas.
+
+    Example:
+        history = QuoteHistory('output/history')
+        history.add('QT-2024-001', template.package_bytes())
+        previous = history.get('QT-2024-001', version=1)
+    """
+
+    def __init__(self, root=os.path.join("output", "history"), keyframe_interval=16):
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+
+    def _directory(self, reference):
+        return os.path.join(self.root, check_reference(reference))
+
+    def versions(self, reference):
+        """Return the stored version numbers of a quote, oldest first."""
+        try:
+            names = os.listdir(self._directory(reference))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[1:5]) for name in names if re.fullmatch(r'v\d{4}\.(docx|delta)', name))
+
+    def _path(self, reference, version, keyframe):
+        return os.path.join(self._directory(reference), f"v{version:04d}.{'docx' if keyframe else 'delta'}")
+
+    def add(self, reference, data):
+        """
+        Store a new version of a quote.
+
+        Args:
+            reference (str): Quote reference, e.g. 'QT-2024-001'
+            data (bytes): The .docx package, ideally from package_bytes()
+
+        Returns:
+            dict: 'version', 'stored' bytes on disk and whether it is a 'keyframe'
+        """
+        data = normalize_package(data)
+        versions = self.versions(reference)
+        version = versions[-1] + 1 if versions else 1
+        keyframe = (version - 1) % self.keyframe_interval == 0
+        stored = data if keyframe else make_delta(self.get(reference, versions[-1]), data)
+
+        path = self._path(reference, version, keyframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(stored)
+        os.replace(tmp_path, path)
+        return {'version': version, 'stored': len(stored), 'keyframe': keyframe}
+
+    def get(self, reference, version=None):
+        """Rebuild a version of a quote (the latest by default) and return its package bytes."""
+        versions = self.versions(reference)
+        if version is None and versions:
+            version = versions[-1]
+        if version not in versions:
+            raise KeyError(f"No version {version} of quote {reference}")
+
+        keyframe = version - (version - 1) % self.keyframe_interval
+        with open(self._path(reference, keyframe, True), 'rb') as f:
+            data = f.read()
+        for number in range(keyframe + 1, version + 1):
+            with open(self._path(reference, number, False), 'rb') as f:
+                data = apply_delta(data, f.read())
+        return data
+
+
+if __name__ == "__main__":
+    commands = {'diff': make_delta, 'apply': apply_delta}
+    if len(sys.argv) != 5 or sys.argv[1] not in commands:
+        print("Usage: python delta.py diff <old.docx> <new.docx> <out.delta>\n"
+              "       python delta.py apply <old.docx> <in.delta> <out.docx>")
+        sys.exit(2)
+    try:
+        with open(sys.argv[2], 'rb') as f:
+            base = f.read()
+        with open(sys.argv[3], 'rb') as f:
+            other = f.read()
+        result = commands[sys.argv[1]](base, other)
+        with open(sys.argv[4], 'wb') as f:
+            f.write(result)
+        print(f"Wrote {len(result)} bytes to {sys.argv[4]}")
+    except Exception as e:
+        print(f"An error occurred while processing the delta: {str(e)}")
+        sys.exit(1)
@@ -1,14 +1,75 @@
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
-from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+import os
+import time
 from datetime import datetime
-import locale
+from optimize import save_optimized
+
+# python-docx is imported inside the methods that need it, so importing this
+# module (e.g. for a CLI --help or to pickle a job) stays cheap.
+
+# Sections that only touch the document body and can be built independently
+PARALLEL_SECTIONS = (
+    'add_quote_info',
+    'add_client_info',
+    'add_coverage_details',
+    'add_terms_and_conditions',
+    'add_premium_summary',
+)
+
+
+class RenderLimitExceeded(Exception):
+    """Raised when building or saving a quote goes over one of its RenderLimits."""
+
+
+class RenderCancelled(RenderLimitExceeded):
+    """Raised when a quote's cancel event is set while it is being built."""
+
+
+class RenderLimits:
+    """
+    Per-document budget, checked cooperatively while a quote is built.
+
+    Every add_* method charges the paragraphs, runs and table rows it is about
+    to create, plus the length of the text it adds, before creating them, so a
+    record with a huge terms list or breakdown dict fails quickly with
+    RenderLimitExceeded instead of stalling its worker.
+
+    Args:
+        max_seconds (float): Wall time from creating the template until it is saved
+        max_elements (int): Paragraphs, runs and table rows the add_* methods may create
+        max_output_bytes (int): Characters of text added, and bytes of the saved package
+    """
+
+    def __init__(self, max_seconds=None, max_elements=None, max_output_bytes=None):
+        self.max_seconds = max_seconds
+        self.max_elements = max_elements
+        self.max_output_bytes = max_output_bytes
+
+
+# Set in each section worker process to the parent's stop event
+_worker_cancel_event = None
+
+
+def _init_section_worker(cancel_event):
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def _build_section_fragment(company_info, method, args, kwargs, limits=None):
+    """
+    Build one section in a fresh template.
+
+    Returns:
+        tuple: The section's body elements as XML, and the elements and text size it charged
+    """
+    from docx.oxml.ns import qn
+    from lxml import etree
+
+    template = InsuranceQuoteTemplate(company_info, limits, _worker_cancel_event)
+    getattr(template, method)(*args, **kwargs)
+    body = template.doc.element.body
+    fragment = [etree.tostring(child) for child in body if child.tag != qn('w:sectPr')]
+    return fragment, template._elements, template._text_size
 
-# Set locale for currency formatting
-locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
 
 class InsuranceQuoteTemplate:
     """
@@ -19,15 +80,66 @@ class InsuranceQuoteTemplate:
     insurance types and can be extended for specific company needs.
     """
     
-    def __init__(self, company_info=None):
-        """Initialize the quote template with company information."""
+    def __init__(self, company_info=None, limits=None, cancel_event=None):
+        """
+        Initialize the quote template with company information.
+
+        Args:
+            company_info (dict): Company name, license number and contact details
+            limits (RenderLimits): Optional per-document budget
+            cancel_event (threading.Event): When set, the next check raises RenderCancelled
+        """
+        from docx import Document
+
         self.doc = Document()
         self.company_info = company_info or {}
+        self.limits = limits
+        self.cancel_event = cancel_event
+        self._started = time.monotonic()
+        self._elements = 0
+        self._text_size = 0
         self._setup_styles()
         self._setup_page_format()
+
+    def _charge(self, elements=1, *texts):
+        """Account for content about to be added and enforce the limits and cancellation."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise RenderCancelled("Render cancelled")
+        limits = self.limits
+        if limits is None:
+            return
+        self._elements += elements
+        if limits.max_elements is not None and self._elements > limits.max_elements:
+            raise RenderLimitExceeded(f"More than {limits.max_elements} elements")
+        if limits.max_output_bytes is not None:
+            self._text_size += sum(len(str(text)) for text in texts)
+            if self._text_size > limits.max_output_bytes:
+                raise RenderLimitExceeded(f"More than {limits.max_output_bytes} bytes of text")
+        if limits.max_seconds is not None:
+            elapsed = time.monotonic() - self._started
+            if elapsed > limits.max_seconds:
+                raise RenderLimitExceeded(f"Render took longer than {limits.max_seconds}s")
+
+    def _remaining_limits(self):
+        """Return limits capping a section at whatever budget this document has left."""
+        limits = self.limits
+        if limits is None:
+            return None
+
+        def remaining(maximum, used):
+            return None if maximum is None else max(maximum - used, 0)
+
+        max_seconds = limits.max_seconds
+        if max_seconds is not None:
+            max_seconds -= time.monotonic() - self._started
+        return RenderLimits(max_seconds, remaining(limits.max_elements, self._elements),
+                            remaining(limits.max_output_bytes, self._text_size))
     
     def _setup_styles(self):
         """Configure document styles for consistent formatting."""
+        from docx.enum.style import WD_STYLE_TYPE
+        from docx.shared import Pt, RGBColor
+
         # Header style for main titles
         header_style = self.doc.styles.add_style('Header Style', WD_STYLE_TYPE.PARAGRAPH)
         header_style.font.size = Pt(16)
@@ -52,6 +164,8 @@ class InsuranceQuoteTemplate:
     
     def _setup_page_format(self):
         """Configure page formatting including margins."""
+        from docx.shared import Inches
+
         section = self.doc.sections[0]
         section.page_margin_left = Inches(1)
         section.page_margin_right = Inches(1)
@@ -59,11 +173,13 @@ class InsuranceQuoteTemplate:
         section.page_margin_bottom = Inches(1)
     
     def _format_currency(self, amount):
-        """Format number as currency string with proper handling of invalid inputs."""
+        """Format number as a US dollar string (e.g. -$1,234.50) with proper handling of invalid inputs."""
         try:
-            return locale.currency(float(amount), grouping=True)
+            value = float(amount)
         except (ValueError, TypeError):
             return str(amount)
+        sign = '-' if value < 0 else ''
+        return f"{sign}${abs(value):,.2f}"
     
     def _get_policy_notes(self, policy_type):
         """Return policy-specific notes based on insurance type."""
@@ -77,6 +193,9 @@ class InsuranceQuoteTemplate:
     
     def _add_page_number(self, paragraph):
         """Add page numbers to the document footer."""
+        from docx.oxml import OxmlElement
+        from docx.oxml.ns import qn
+
         page_num_run = paragraph.add_run()
         fldChar1 = OxmlElement('w:fldChar')
         fldChar1.set(qn('w:fldCharType'), 'begin')
@@ -94,6 +213,9 @@ class InsuranceQuoteTemplate:
     
     def add_company_header(self, logo_path=None):
         """Add company header with logo and registration information."""
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches
+
         if logo_path:
             self.doc.add_picture(logo_path, width=Inches(2))
         
@@ -110,6 +232,8 @@ class InsuranceQuoteTemplate:
     
     def add_quote_info(self, quote_data):
         """Add detailed quote reference information."""
+        self._charge(14, quote_data.get('reference', 'TBD'), quote_data.get('valid_until', 'N/A'),
+                     *quote_data.get('agent', {}).values())
         quote_info = self.doc.add_paragraph(style='Normal Style')
         
         quote_info.add_run('Quote Reference: ').bold = True
@@ -139,12 +263,14 @@ class InsuranceQuoteTemplate:
         personal_info = left_cell.add_paragraph(style='Normal Style')
         personal_info.add_run('Personal Details\n').bold = True
         for key in ['Name', 'Date of Birth', 'Address', 'Phone', 'Email']:
+            self._charge(2, client_data.get(key, 'N/A'))
             personal_info.add_run(f'{key}: ').bold = True
             personal_info.add_run(f"{client_data.get(key, 'N/A')}\n")
         
         policy_info = right_cell.add_paragraph(style='Normal Style')
         policy_info.add_run('Policy Information\n').bold = True
         for key in ['Policy Type', 'Current Provider', 'Claims History', 'Risk Level']:
+            self._charge(2, client_data.get(key, 'N/A'))
             policy_info.add_run(f'{key}: ').bold = True
             policy_info.add_run(f"{client_data.get(key, 'N/A')}\n")
         
@@ -167,6 +293,7 @@ class InsuranceQuoteTemplate:
             table.rows[0].cells[i].paragraphs[0].runs[0].bold = True
         
         for item in coverage_items:
+            self._charge(5, item.get('type', ''))
             row_cells = table.add_row().cells
             row_cells[0].text = item.get('type', '')
             row_cells[1].text = self._format_currency(item.get('amount', 0))
@@ -182,6 +309,7 @@ class InsuranceQuoteTemplate:
         terms_para = self.doc.add_paragraph(style='Normal Style')
         terms_para.add_run('By accepting this quote, you agree to the following terms:\n\n')
         for term in terms:
+            self._charge(1, term)
             terms_para.add_run(f'• {term}\n')
         
         if disclaimers:
@@ -189,6 +317,7 @@ class InsuranceQuoteTemplate:
             disclaimer_para = self.doc.add_paragraph(style='Normal Style')
             disclaimer_para.add_run('Please note:\n\n')
             for disclaimer in disclaimers:
+                self._charge(1, disclaimer)
                 disclaimer_para.add_run(f'* {disclaimer}\n')
         
         self.doc.add_paragraph()
@@ -205,6 +334,7 @@ class InsuranceQuoteTemplate:
         
         breakdown = premium_data.get('breakdown', {})
         for item, amount in breakdown.items():
+            self._charge(3, item)
             para = left_cell.add_paragraph(style='Normal Style')
             para.add_run(f'{item}: ').bold = True
             para.add_run(self._format_currency(amount))
@@ -214,14 +344,82 @@ class InsuranceQuoteTemplate:
         
         options = premium_data.get('payment_options', [])
         for option in options:
+            self._charge(3, option['term'], option['description'])
             para = right_cell.add_paragraph(style='Normal Style')
             para.add_run(f"{option['term']}: ").bold = True
             para.add_run(f"{option['description']}")
         
         self.doc.add_paragraph()
     
+    def add_sections_parallel(self, sections, max_workers=None):
+        """
+        Build independent sections in worker processes and append them in order.
+
+        Every section is rendered into its own document in a separate process,
+        serialized as body XML and stitched into this document in the order
+        given, so a very large quote uses every core instead of one. Each worker
+        may use the whole remaining budget, and what it used is charged to this
+        document as soon as it finishes, so the total is enforced here. The
+        first failure, an exceeded total or setting cancel_event stops the
+        other workers and cancels sections not yet started.
+
+        Args:
+            sections (list): (method_name, args, kwargs) tuples, e.g.
+                ('add_coverage_details', (coverage_items, 'Auto'), {})
+            max_workers (int): Worker processes, defaults to the CPU count
+        """
+        import multiprocessing
+        from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import qn
+
+        for method, _, _ in sections:
+            if method not in PARALLEL_SECTIONS:
+                raise ValueError(f"Section cannot be built in parallel: {method}")
+
+        self._charge(0)
+        limits = self._remaining_limits()
+        stop = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_section_worker,
+                                 initargs=(stop,)) as executor:
+            futures = [
+                executor.submit(_build_section_fragment, self.company_info, method, tuple(args), dict(kwargs),
+                                limits)
+                for method, args, kwargs in sections
+            ]
+            try:
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.05, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        if future.exception() is not None:
+                            raise future.exception()
+                        _, elements, text_size = future.result()
+                        self._elements += elements
+                        self._text_size += text_size
+                        self._charge(0)
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        raise RenderCancelled("Render cancelled")
+            except BaseException:
+                stop.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        fragments = [future.result()[0] for future in futures]
+        body = self.doc.element.body
+        sect_pr = body.find(qn('w:sectPr'))
+        for fragment in fragments:
+            for xml in fragment:
+                element = parse_xml(xml)
+                if sect_pr is not None:
+                    sect_pr.addprevious(element)
+                else:
+                    body.append(element)
+    
     def add_footer(self, include_page_numbers=True):
         """Add professional footer with company contact information and optional page numbers."""
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         footer = self.doc.sections[0].footer
         footer_para = footer.paragraphs[0]
         
@@ -235,13 +433,54 @@ class InsuranceQuoteTemplate:
         if include_page_numbers:
             self._add_page_number(footer_para)
     
-    def save_document(self, filename):
-        """Save the generated quote document."""
-        self.doc.save(filename)
+    def save_document(self, filename, optimize=True, minimal=False):
+        """
+        Save the generated quote document.
+
+        Runs are coalesced unless optimize is False; minimal strips the unused
+        styles, latent styles and theme carried over from the default template.
+        With a max_output_bytes limit the package is serialized in memory first
+        and nothing is written if it is too large.
+        """
+        self._charge(0)
+        if self.limits is None or self.limits.max_output_bytes is None:
+            return save_optimized(self.doc, filename, optimize, minimal)
+
+        from io import BytesIO
+
+        buffer = BytesIO()
+        report = save_optimized(self.doc, buffer, optimize, minimal)
+        size = buffer.tell()
+        if size > self.limits.max_output_bytes:
+            raise RenderLimitExceeded(f"Document is {size} bytes, limit is {self.limits.max_output_bytes}")
+        if hasattr(filename, 'write'):
+            filename.write(buffer.getvalue())
+        else:
+            with open(filename, 'wb') as f:
+                f.write(buffer.getvalue())
+        return report
 
+    def package_bytes(self, optimize=True, minimal=False, timestamp=None):
+        """
+        Return the quote as a deterministic .docx package, e.g. for delta.QuoteHistory.
 
-def create_sample_quote():
-    """Create a sample insurance quote with all available features."""
+        Unchanged parts serialize to identical bytes on every call, so a
+        reissued quote only differs from its previous version where its
+        content does; see delta.package_bytes() for the arguments. The
+        max_output_bytes limit applies as it does in save_document().
+        """
+        from delta import package_bytes
+
+        self._charge(0)
+        data = package_bytes(self.doc, optimize, minimal, timestamp)
+        if self.limits is not None and self.limits.max_output_bytes is not None \
+                and len(data) > self.limits.max_output_bytes:
+            raise RenderLimitExceeded(f"Document is {len(data)} bytes, limit is {self.limits.max_output_bytes}")
+        return data
+
+
+def build_sample_quote():
+    """Build a sample insurance quote with all available features."""
     # Company information
     company_info = {
         'name': 'ABC Insurance Company',
@@ -250,8 +489,6 @@ def create_sample_quote():
         'email': 'quotes@abcinsurance.com'
     }
     
-    template = InsuranceQuoteTemplate(company_info)
-    
     # Quote information
     quote_data = {
         'reference': 'QT-2024-001',
@@ -356,16 +593,110 @@ def create_sample_quote():
     ]
     
     # Generate the complete quote document
-    template.add_company_header()  # Add logo_path parameter if you have a company logo
-    template.add_quote_info(quote_data)
-    template.add_client_info(client_data)
-    template.add_coverage_details(coverage_items, 'Auto')
-    template.add_terms_and_conditions(terms, disclaimers)
-    template.add_premium_summary(premium_data)
+    return build_quote({
+        'company_info': company_info,
+        'quote_data': quote_data,
+        'client_data': client_data,
+        'coverage_items': coverage_items,
+        'policy_type': 'Auto',
+        'terms': terms,
+        'disclaimers': disclaimers,
+        'premium_data': premium_data,
+    })
+
+
+def build_quote(record, limits=None, cancel_event=None):
+    """
+    Build a quote from one record, adding only the sections the record has data for.
+
+    Args:
+        record (dict): 'company_info', 'logo_path', 'quote_data', 'client_data',
+            'coverage_items', 'policy_type', 'terms', 'disclaimers' and 'premium_data'
+        limits (RenderLimits): Optional per-document budget
+        cancel_event (threading.Event): Set to abandon the build
+
+    Returns:
+        InsuranceQuoteTemplate: The built template, ready for save_document()
+    """
+    template = InsuranceQuoteTemplate(record.get('company_info'), limits, cancel_event)
+    template.add_company_header(record.get('logo_path'))
+    if 'quote_data' in record:
+        template.add_quote_info(record['quote_data'])
+    if 'client_data' in record:
+        template.add_client_info(record['client_data'])
+    if 'coverage_items' in record:
+        template.add_coverage_details(record['coverage_items'], record.get('policy_type', 'Auto'))
+    if 'terms' in record:
+        template.add_terms_and_conditions(record['terms'], record.get('disclaimers'))
+    if 'premium_data' in record:
+        template.add_premium_summary(record['premium_data'])
     template.add_footer(include_page_numbers=True)
-    
-    # Save the final document
-    template.save_document('enhanced_insurance_quote.docx')
+    return template
+
+
+def _render_record(record, path, limits, cancel_event):
+    build_quote(record, limits, cancel_event).save_document(path)
+    return path
+
+
+def render_batch(records, output_dir="output", limits=None, workers=4, cancel_event=None):
+    """
+    Render many quotes on a RenderScheduler, reporting records that fail instead of stopping.
+
+    A record that goes over its limits raises RenderLimitExceeded inside its
+    own job at the next cooperative check, so its worker moves on to the next
+    record. Setting cancel_event abandons every render that is still running.
+
+    Args:
+        records (list): Records as accepted by build_quote()
+        output_dir (str): Directory for the rendered quotes, named <reference>_<record index>.docx
+        limits (RenderLimits): Budget applied to each document separately
+        workers (int): Number of concurrent renders
+        cancel_event (threading.Event): Set to cancel the rest of the batch
+
+    Returns:
+        list: One dict per record, in order, with 'reference', 'path' and 'error'
+    """
+    from delta import check_reference
+    from scheduler import RenderScheduler
+
+    os.makedirs(output_dir, exist_ok=True)
+    references, futures = [], []
+    with RenderScheduler(workers=workers) as scheduler:
+        for i, record in enumerate(records):
+            reference = None
+            try:
+                reference = record.get('quote_data', {}).get('reference')
+                # The record index keeps two records with the same reference apart
+                path = os.path.join(output_dir, f"{check_reference(reference or 'quote')}_{i}.docx")
+            except Exception as e:
+                # A malformed record is that record's failure, not the batch's
+                references.append(reference)
+                futures.append(e)
+                continue
+            references.append(reference)
+            futures.append(scheduler.submit(_render_record, record, path, limits, cancel_event))
+
+    results = []
+    for reference, future in zip(references, futures):
+        path, error = None, future if isinstance(future, Exception) else None
+        if error is None:
+            try:
+                path = future.result()
+            except Exception as e:
+                error = e
+        results.append({
+            'reference': reference,
+            'path': path,
+            'error': None if error is None else f"{type(error).__name__}: {error}",
+        })
+    return results
+
+
+def create_sample_quote(filename='enhanced_insurance_quote.docx'):
+    """Create a sample insurance quote and save it to disk."""
+    template = build_sample_quote()
+    template.save_document(filename)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Minimal Base Package
+Strips the parts of python-docx's default template that a document does not use.
+
+Every Document() starts from a template carrying hundreds of style definitions,
+the latent style table, a stylesWithEffects copy of the styles, the theme, the
+font table and a thumbnail. minimize_package() keeps only the styles the
+document references (plus the defaults and their basedOn/link chains) and drops
+the optional parts. Theme font references are replaced by the concrete fonts
+they resolved to, so the rendered text keeps its typeface.
+"""
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+W_STYLE = qn('w:style')
+W_STYLE_ID = qn('w:styleId')
+W_DEFAULT = qn('w:default')
+W_VAL = qn('w:val')
+W_RFONTS = qn('w:rFonts')
+W_COLOR = qn('w:color')
+
+STYLE_REFERENCES = (qn('w:pStyle'), qn('w:rStyle'), qn('w:tblStyle'), qn('w:numStyleLink'))
+STYLE_LINKS = (qn('w:basedOn'), qn('w:link'))
+
+# Relationship types, by their last path segment, that Word can open without
+DROPPED_PART_RELS = ('stylesWithEffects', 'theme', 'fontTable', 'webSettings', 'customXml')
+DROPPED_PACKAGE_RELS = ('thumbnail',)
+
+THEME_FONT_ATTRS = {
+    qn('w:asciiTheme'): qn('w:ascii'),
+    qn('w:hAnsiTheme'): qn('w:hAnsi'),
+    qn('w:eastAsiaTheme'): qn('w:eastAsia'),
+    qn('w:cstheme'): qn('w:cs'),
+}
+THEME_COLOR_ATTRS = (qn('w:themeColor'), qn('w:themeShade'), qn('w:themeTint'))
+
+DRAWINGML = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+
+def _reltype_name(rel):
+    return rel.reltype.rsplit('/', 1)[-1]
+
+
+def _content_parts(doc):
+    """Yield the document, header and footer parts, whose XML references styles."""
+    yield doc.part
+    for rel in doc.part.rels.values():
+        if not rel.is_external and _reltype_name(rel) in ('header', 'footer'):
+            yield rel.target_part
+
+
+def used_style_ids(doc):
+    """Return the style ids referenced by the document body, headers and footers."""
+    used = set()
+    for part in _content_parts(doc):
+        for tag in STYLE_REFERENCES:
+            for ref in part.element.iter(tag):
+                used.add(ref.get(W_VAL))
+    return used
+
+
+def _theme_fonts(doc):
+    """Map theme font names such as 'minorHAnsi' to the typeface they resolve to."""
+    for rel in doc.part.rels.values():
+        if not rel.is_external and _reltype_name(rel) == 'theme':
+            theme = etree.fromstring(rel.target_part.blob)
+            break
+    else:
+        return {}
+
+    fonts = {}
+    for scheme in ('major', 'minor'):
+        font = theme.find(f'.//{{{DRAWINGML}}}{scheme}Font')
+        if font is None:
+            continue
+        latin, ea, cs = (font.find(f'{{{DRAWINGML}}}{script}') for script in ('latin', 'ea', 'cs'))
+        for name, element in (('HAnsi', latin), ('Ascii', latin), ('EastAsia', ea), ('Bidi', cs)):
+            if element is not None and element.get('typeface'):
+                fonts[f'{scheme}{name}'] = element.get('typeface')
+    return fonts
+
+
+def _resolve_theme_references(element, theme_fonts):
+    """Replace theme font and color references below element with concrete values."""
+    for rfonts in element.iter(W_RFONTS):
+        for theme_attr, font_attr in THEME_FONT_ATTRS.items():
+            theme_font = rfonts.attrib.pop(theme_attr, None)
+            if theme_font in theme_fonts and font_attr not in rfonts.attrib:
+                rfonts.set(font_attr, theme_fonts[theme_font])
+    for color in element.iter(W_COLOR):
+        for attr in THEME_COLOR_ATTRS:
+            color.attrib.pop(attr, None)
+
+
+def _prune_styles(styles_element, used):
+    """Drop latent styles and every style not reachable from the used ones."""
+    latent = styles_element.find(qn('w:latentStyles'))
+    if latent is not None:
+        styles_element.remove(latent)
+
+    by_id = {style.get(W_STYLE_ID): style for style in styles_element.iter(W_STYLE)}
+    keep = set(used)
+    keep.update(sid for sid, style in by_id.items() if style.get(W_DEFAULT) == '1')
+    pending = list(keep)
+    while pending:
+        style = by_id.get(pending.pop())
+        if style is None:
+            continue
+        for link in STYLE_LINKS:
+            ref = style.find(link)
+            if ref is not None and ref.get(W_VAL) not in keep:
+                keep.add(ref.get(W_VAL))
+                pending.append(ref.get(W_VAL))
+
+    removed = 0
+    for sid, style in by_id.items():
+        if sid not in keep:
+            styles_element.remove(style)
+            removed += 1
+    for style in styles_element.iter(W_STYLE):
+        next_style = style.find(qn('w:next'))
+        if next_style is not None and next_style.get(W_VAL) not in keep:
+            style.remove(next_style)
+    return removed
+
+
+def _uses_numbering(doc, styles_element):
+    elements = [part.element for part in _content_parts(doc)] + [styles_element]
+    return any(next(element.iter(qn('w:numPr')), None) is not None for element in elements)
+
+
+def minimize_package(doc):
+    """
+    Reduce a document to a minimal base package in place.
+
+    Args:
+        doc: python-docx Document, typically right before saving
+
+    Returns:
+        dict: Number of 'styles_removed' and the names of 'parts_removed'
+    """
+    styles_element = doc.styles.element
+    theme_fonts = _theme_fonts(doc)
+    removed = _prune_styles(styles_element, used_style_ids(doc))
+    _resolve_theme_references(styles_element, theme_fonts)
+    for part in _content_parts(doc):
+        _resolve_theme_references(part.element, theme_fonts)
+
+    dropped = list(DROPPED_PART_RELS)
+    if not _uses_numbering(doc, styles_element):
+        dropped.append('numbering')
+
+    parts_removed = []
+    for rels, names in ((doc.part.rels, dropped), (doc.part.package.rels, DROPPED_PACKAGE_RELS)):
+        for rId, rel in list(rels.items()):
+            if not rel.is_external and _reltype_name(rel) in names:
+                parts_removed.append(str(rel.target_part.partname))
+                del rels[rId]
+
+    return {"styles_removed": removed, "parts_removed": parts_removed}
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Document Optimizer
+Coalesces runs and minifies the WordprocessingML of generated documents.
+
+The builders add every line and every conditional tag as its own run, which
+bloats document.xml with repeated run properties. This pass merges adjacent
+runs with identical formatting, drops empty runs, empty property elements and
+run properties that repeat what the paragraph already inherits from its
+styles, and moves each {tag} into a single run so Docxtemplater never sees a
+split tag. Only text, break and tab content is touched, so the rendered appearance
+is unchanged.
+"""
+
+import re
+
+# Clark-notation names, spelled out so importing this module does not pull in
+# python-docx and lxml; they are imported where a document is processed.
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P = W + 'p'
+W_R = W + 'r'
+W_T = W + 't'
+W_BR = W + 'br'
+W_TAB = W + 'tab'
+W_CR = W + 'cr'
+W_RPR = W + 'rPr'
+W_PPR = W + 'pPr'
+W_PSTYLE = W + 'pStyle'
+W_RSTYLE = W + 'rStyle'
+W_TBL = W + 'tbl'
+W_TBL_PR = W + 'tblPr'
+W_TBL_STYLE = W + 'tblStyle'
+W_TBL_STYLE_PR = W + 'tblStylePr'
+W_STYLE = W + 'style'
+W_BASED_ON = W + 'basedOn'
+W_DOC_DEFAULTS = W + 'docDefaults'
+W_RPR_DEFAULT = W + 'rPrDefault'
+W_VAL = W + 'val'
+W_TYPE = W + 'type'
+W_DEFAULT = W + 'default'
+W_STYLE_ID = W + 'styleId'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Run content that can safely be moved between runs with the same formatting
+TEXT_CONTENT = (W_T, W_BR, W_TAB, W_CR)
+
+TAG_PATTERN = re.compile(r'\{[^{}\n\t]*\}')
+
+# Text that breaks and tabs stand for when looking for {tag}s, so no tag spans one
+CONTENT_TEXT = {W_BR: '\n', W_CR: '\n', W_TAB: '\t'}
+
+# Run properties whose style values toggle rather than override (ECMA-376 17.7.3)
+TOGGLE_PROPERTIES = frozenset(W + name for name in (
+    'b', 'bCs', 'i', 'iCs', 'caps', 'smallCaps', 'strike', 'dstrike',
+    'outline', 'shadow', 'emboss', 'imprint', 'vanish',
+))
+OFF_VALUES = ('0', 'false', 'off')
+
+OPTIMIZED_PARTS = ('/word/document.xml', '/word/header', '/word/footer')
+
+
+def _is_text_run(run):
+    """Return True if the run only holds formatting and movable text content."""
+    for child in run:
+        if child.tag == W_RPR:
+            continue
+        if child.tag not in TEXT_CONTENT:
+            return False
+        if child.tag == W_BR and child.attrib:
+            return False  # page and column breaks stay where they are
+    return True
+
+
+def _run_format(run):
+    """Return a comparable key for a run's formatting."""
+    from lxml import etree
+
+    rpr = run.find(W_RPR)
+    return b'' if rpr is None else etree.tostring(rpr)
+
+
+def _set_text(t, text):
+    t.text = text
+    if text != text.strip():
+        t.set(XML_SPACE, 'preserve')
+    elif XML_SPACE in t.attrib:
+        del t.attrib[XML_SPACE]
+
+
+def _merge_text_elements(run):
+    """Join adjacent w:t elements inside a run."""
+    previous = None
+    for child in list(run):
+        if child.tag == W_T and previous is not None and previous.tag == W_T:
+            _set_text(previous, (previous.text or '') + (child.text or ''))
+            run.remove(child)
+        else:
+            previous = child
+
+
+def _text_groups(paragraph):
+    """Yield lists of consecutive text runs that are direct children of a paragraph."""
+    group = []
+    for child in paragraph:
+        if child.tag == W_R and _is_text_run(child):
+            group.append(child)
+            continue
+        if child.tag == W_PPR:
+            continue
+        if group:
+            yield group
+        group = []
+    if group:
+        yield group
+
+
+def _join_split_tags(runs):
+    """Move every {tag} that spans several runs, but no break or tab, into the run where it starts."""
+    segments = [child for run in runs for child in run if child.tag in TEXT_CONTENT]
+    offsets = []
+    text = ''
+    for child in segments:
+        offsets.append(len(text))
+        text += (child.text or '') if child.tag == W_T else CONTENT_TEXT[child.tag]
+
+    for match in reversed(list(TAG_PATTERN.finditer(text))):
+        start, end = match.span()
+        first = max(i for i, offset in enumerate(offsets) if offset <= start)
+        last = max(i for i, offset in enumerate(offsets) if offset < end)
+        if first == last:
+            continue
+        head = segments[first]
+        _set_text(head, (head.text or '')[:start - offsets[first]] + match.group())
+        for t in segments[first + 1:last]:
+            _set_text(t, '')
+        tail = segments[last]
+        _set_text(tail, (tail.text or '')[end - offsets[last]:])
+
+
+def _same_element(a, b):
+    """Compare two property elements by tag, attributes and children, ignoring namespace declarations."""
+    return (a.tag == b.tag and dict(a.attrib) == dict(b.attrib) and len(a) == len(b)
+            and all(_same_element(x, y) for x, y in zip(a, b)))
+
+
+class StyleSheet:
+    """Run properties each paragraph inherits from the document defaults and its styles."""
+
+    def __init__(self, styles_element):
+        self._styles = {}
+        self._defaults = {}
+        for style in styles_element.iter(W_STYLE):
+            self._styles[style.get(W_STYLE_ID)] = style
+            if style.get(W_DEFAULT) in ('1', 'true'):
+                self._defaults[style.get(W_TYPE)] = style.get(W_STYLE_ID)
+        self._doc_defaults = styles_element.find(f'{W_DOC_DEFAULTS}/{W_RPR_DEFAULT}/{W_RPR}')
+        self._cache = {}
+
+    def _chain(self, style_id):
+        """Return the rPr elements of a style and the styles it is based on, base first."""
+        levels, seen = [], set()
+        while style_id is not None and style_id not in seen:
+            seen.add(style_id)
+            style = self._styles.get(style_id)
+            if style is None:
+                break
+            rpr = style.find(W_RPR)
+            if rpr is not None:
+                levels.append(rpr)
+            based_on = style.find(W_BASED_ON)
+            style_id = None if based_on is None else based_on.get(W_VAL)
+        return levels[::-1]
+
+    def inherited(self, paragraph):
+        """
+        Return {property tag: [elements of every level that sets it]} for a paragraph's runs.
+
+        Returns None when the paragraph sits in a table whose style has
+        conditional formatting, which this does not resolve.
+        """
+        ppr = paragraph.find(W_PPR)
+        pstyle = None if ppr is None else ppr.find(W_PSTYLE)
+        paragraph_style = self._defaults.get('paragraph') if pstyle is None else pstyle.get(W_VAL)
+
+        table_style = None
+        table = next(paragraph.iterancestors(W_TBL), None)
+        if table is not None:
+            style = table.find(f'{W_TBL_PR}/{W_TBL_STYLE}')
+            table_style = self._defaults.get('table') if style is None else style.get(W_VAL)
+            if any(self._styles[s].find(W_TBL_STYLE_PR) is not None
+                   for s in self._based_on(table_style)):
+                return None
+
+        key = (paragraph_style, table_style)
+        if key not in self._cache:
+            levels = [self._doc_defaults] + self._chain(table_style) + self._chain(paragraph_style) \
+                + self._chain(self._defaults.get('character'))
+            properties = {}
+            for rpr in levels:
+                if rpr is not None:
+                    for prop in rpr:
+                        properties.setdefault(prop.tag, []).append(prop)
+            self._cache[key] = properties
+        return self._cache[key]
+
+    def _based_on(self, style_id):
+        seen = []
+        while style_id in self._styles and style_id not in seen:
+            seen.append(style_id)
+            based_on = self._styles[style_id].find(W_BASED_ON)
+            style_id = None if based_on is None else based_on.get(W_VAL)
+        return seen
+
+
+def _is_redundant(prop, levels):
+    """Return True if a direct run property does not change what the styles already give."""
+    if prop.tag in TOGGLE_PROPERTIES:
+        value_on = prop.get(W_VAL) not in OFF_VALUES
+        if not levels:
+            return not value_on
+        # Toggles set on more than one level combine; only judge a single level
+        return len(levels) == 1 and (levels[0].get(W_VAL) not in OFF_VALUES) == value_on
+    return bool(levels) and _same_element(prop, levels[-1])
+
+
+def drop_redundant_properties(paragraph, styles):
+    """Remove direct run properties of a w:p that repeat its inherited formatting."""
+    inherited = styles.inherited(paragraph)
+    if inherited is None:
+        return
+    for run in paragraph.iterchildren(W_R):
+        rpr = run.find(W_RPR)
+        if rpr is None or rpr.find(W_RSTYLE) is not None:
+            continue
+        for prop in list(rpr):
+            if _is_redundant(prop, inherited.get(prop.tag)):
+                rpr.remove(prop)
+
+
+def _is_empty_run(run):
+    for child in run:
+        if child.tag == W_RPR:
+            continue
+        if child.tag == W_T and not child.text:
+            continue
+        return False
+    return True
+
+
+def optimize_paragraph(paragraph, styles=None):
+    """Coalesce the runs of a single w:p element in place; a StyleSheet also drops redundant properties."""
+    if styles is not None:
+        drop_redundant_properties(paragraph, styles)
+    for group in _text_groups(paragraph):
+        _join_split_tags(group)
+        previous = None
+        for run in group:
+            for t in run.findall(W_T):
+                if not t.text:
+                    run.remove(t)
+            if _is_empty_run(run):
+                paragraph.remove(run)
+                continue
+            if previous is not None and _run_format(previous) == _run_format(run):
+                for child in list(run):
+                    if child.tag != W_RPR:
+                        previous.append(child)
+                paragraph.remove(run)
+                continue
+            previous = run
+        for run in group:
+            if run.getparent() is paragraph:
+                _merge_text_elements(run)
+
+
+def minify_element(element, styles=None):
+    """Optimize every paragraph below element and drop empty property elements."""
+    for paragraph in element.iter(W_P):
+        optimize_paragraph(paragraph, styles)
+    for props in list(element.iter(W_RPR, W_PPR)):
+        if len(props) == 0 and not props.attrib:
+            props.getparent().remove(props)
+
+
+def _optimized_parts(doc):
+    from docx.opc.part import XmlPart
+
+    for part in doc.part.package.iter_parts():
+        if isinstance(part, XmlPart) and str(part.partname).startswith(OPTIMIZED_PARTS):
+            yield part
+
+
+def optimize_document(doc):
+    """
+    Run the optimizer pass over the body, headers and footers of a document.
+
+    Args:
+        doc: python-docx Document to optimize in place
+
+    Returns:
+        dict: Serialized XML size under 'before' and 'after' and 'saved' bytes
+    """
+    from lxml import etree
+
+    styles = StyleSheet(doc.styles.element)
+    before = after = 0
+    for part in _optimized_parts(doc):
+        before += len(etree.tostring(part.element))
+        minify_element(part.element, styles)
+        after += len(etree.tostring(part.element))
+    return {"before": before, "after": after, "saved": before - after}
+
+
+def save_optimized(doc, path, optimize=True, minimal=False):
+    """
+    Optimize a document and save it, returning the optimizer report.
+
+    Args:
+        doc: python-docx Document to save
+        path (str): Path where the document should be saved
+        optimize (bool): Coalesce runs and minify the XML before saving
+        minimal (bool): Strip unused styles and optional parts, see minimal.py
+    """
+    report = optimize_document(doc) if optimize else {"before": 0, "after": 0, "saved": 0}
+    if minimal:
+        from minimal import minimize_package
+
+        report.update(minimize_package(doc))
+    doc.save(path)
+    return report
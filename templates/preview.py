@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Document Preview Extraction
+Streams word/document.xml into plain text or lightweight HTML previews.
+
+Loading a generated quote with python-docx builds the whole object tree just to
+show its text. extract_preview() reads the package with zipfile, walks
+document.xml with iterparse and discards every element once it has been
+emitted, so memory stays flat and a first-N-pages/characters preview stops
+reading as soon as it has enough, closing any table it stopped inside. Paragraphs, tables (including 'Table Grid'
+tables) and footers are converted. Results are cached by content hash.
+"""
+
+import hashlib
+import html
+import os
+import sys
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+from xml.etree.ElementTree import iterparse
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P, W_R, W_T, W_TAB, W_BR, W_CR = W + 'p', W + 'r', W + 't', W + 'tab', W + 'br', W + 'cr'
+W_TBL, W_TR, W_TC = W + 'tbl', W + 'tr', W + 'tc'
+W_RPR, W_B, W_PSTYLE, W_TBLSTYLE = W + 'rPr', W + 'b', W + 'pStyle', W + 'tblStyle'
+W_PAGE_BREAK_BEFORE, W_RENDERED_BREAK = W + 'pageBreakBefore', W + 'lastRenderedPageBreak'
+W_VAL, W_TYPE = W + 'val', W + 'type'
+
+FORMATS = ('text', 'html')
+
+# Bump when the preview output changes so cached previews are not reused
+CACHE_VERSION = 2
+
+
+class PreviewCache:
+    """
+    LRU cache of previews keyed by document content hash and preview options.
+
+    Entries live in memory; when a directory is given they are also written to
+    disk so other processes and later runs can reuse them.
+    """
+
+    def __init__(self, directory=None, max_entries=256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.preview")
+
+    def get(self, key):
+        """Return a cached preview or None."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if self.directory:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    value = f.read()
+            except OSError:
+                return None
+            self._remember(key, value)
+            return value
+        return None
+
+    def put(self, key, value):
+        """Store a preview in memory and, if configured, on disk."""
+        self._remember(key, value)
+        if self.directory:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+DEFAULT_CACHE = PreviewCache()
+
+
+class _PreviewLimit(Exception):
+    """Raised internally once a preview has reached its page or character budget."""
+
+
+# Page size used to estimate page breaks when the document records none, as
+# python-docx output does: 11pt text on a Letter page with 1" margins
+CHARS_PER_LINE = 90
+LINES_PER_PAGE = 46
+
+
+def _line_count(text):
+    return sum(max(1, -(-len(line) // CHARS_PER_LINE)) for line in text.split('\n'))
+
+
+class _Writer:
+    """Collects converted blocks and enforces the preview limits."""
+
+    def __init__(self, fmt, max_pages, max_chars):
+        self.fmt = fmt
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.blocks = []
+        self.size = 0
+        self.page = 1
+        self.lines = 0
+        self.estimate = True
+
+    def page_break(self, recorded=True):
+        self.page += 1
+        self.lines = 0
+        if recorded:
+            self.estimate = False  # the document records its own page breaks
+        if self.max_pages is not None and self.page > self.max_pages:
+            raise _PreviewLimit()
+
+    def advance(self, lines):
+        """Account for estimated lines of body content, breaking to a new page when it is full."""
+        if not self.estimate:
+            return
+        self.lines += lines
+        if self.lines > LINES_PER_PAGE:
+            self.page_break(recorded=False)
+            self.lines = lines
+
+    def emit(self, block):
+        self.blocks.append(block)
+
+
+class _Table:
+    """Rows read so far of a table that is still open."""
+
+    __slots__ = ('rows', 'style', 'row', 'cell', 'cell_lines', 'row_lines')
+
+    def __init__(self):
+        self.rows = []
+        self.style = None
+        self.row = None
+        self.cell = None
+        self.cell_lines = 0
+        self.row_lines = 0
+
+
+def _paragraph_block(fmt, pieces, style):
+    if fmt == 'text':
+        return ''.join(text for text, _ in pieces)
+    body = ''.join(
+        f"<b>{html.escape(text)}</b>" if bold else html.escape(text)
+        for text, bold in pieces
+    ).replace('\n', '<br>')
+    cls = f' class="{html.escape(style)}"' if style else ''
+    return f"<p{cls}>{body}</p>"
+
+
+def _table_block(fmt, rows, style):
+    if fmt == 'text':
+        return '\n'.join(' | '.join(cell.replace('\n', ' ') for cell in row) for row in rows)
+    cls = f' class="{html.escape(style)}"' if style else ''
+    body = ''.join(
+        '<tr>' + ''.join(f"<td>{cell}</td>" for cell in row) + '</tr>'
+        for row in rows
+    )
+    return f"<table{cls}>{body}</table>"
+
+
+def _close_cell(fmt, table):
+    table.row.append(('\n' if fmt == 'text' else '').join(table.cell))
+    table.cell = None
+
+
+def _close_tables(writer, tables):
+    """Render what has been read of every open table, innermost first, and emit the result."""
+    block = None
+    while tables:
+        table = tables.pop()
+        if block is not None and table.cell is not None:
+            table.cell.append(block)
+        if table.cell is not None and table.row is not None:
+            _close_cell(writer.fmt, table)
+        if table.row:
+            table.rows.append(table.row)
+        block = _table_block(writer.fmt, table.rows, table.style) if table.rows else None
+    if block is not None:
+        writer.emit(block)
+
+
+def _convert(stream, writer):
+    """Stream one WordprocessingML part into the writer."""
+    fmt = writer.fmt
+    pieces, style, bold, in_run, pending = [], None, False, False, 0
+    tables = []  # stack of open _Table
+
+    def place(block):
+        if tables and tables[-1].cell is not None:
+            tables[-1].cell.append(block)
+        else:
+            writer.emit(block)
+
+    def page_break():
+        if writer.max_pages is not None and writer.page >= writer.max_pages and pieces:
+            place(_paragraph_block(fmt, pieces, style))  # text before the break is on this page
+            pieces.clear()
+        writer.page_break()
+
+    try:
+        for event, elem in iterparse(stream, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == W_P:
+                    pieces, style, pending = [], None, 0
+                elif tag == W_R:
+                    in_run, bold = True, False
+                elif tag == W_TBL:
+                    tables.append(_Table())
+                elif tag == W_TR and tables:
+                    tables[-1].row, tables[-1].row_lines = [], 0
+                elif tag == W_TC and tables:
+                    tables[-1].cell, tables[-1].cell_lines = [], 0
+                continue
+
+            if tag == W_T:
+                text = elem.text or ''
+                pending += len(text)
+                if writer.max_chars is not None and writer.size + pending > writer.max_chars:
+                    # Cut the text itself, before any markup is rendered around it
+                    text = text[:max(len(text) - (writer.size + pending - writer.max_chars), 0)]
+                    pieces.append((text, bold))
+                    place(_paragraph_block(fmt, pieces, style))
+                    raise _PreviewLimit()
+                pieces.append((text, bold))
+            elif tag == W_R:
+                in_run = False
+            elif tag == W_TAB and in_run:
+                pieces.append(('\t', bold))
+            elif tag == W_BR:
+                if elem.get(W_TYPE) == 'page':
+                    page_break()
+                else:
+                    pieces.append(('\n', bold))
+            elif tag == W_CR:
+                pieces.append(('\n', bold))
+            elif tag == W_B and in_run:
+                bold = elem.get(W_VAL) not in ('0', 'false')
+            elif tag in (W_RENDERED_BREAK, W_PAGE_BREAK_BEFORE):
+                page_break()
+            elif tag == W_PSTYLE:
+                style = elem.get(W_VAL)
+            elif tag == W_TBLSTYLE and tables:
+                tables[-1].style = elem.get(W_VAL)
+            elif tag == W_P:
+                writer.size += pending
+                pending = 0
+                lines = _line_count(''.join(text for text, _ in pieces))
+                if tables:
+                    tables[-1].cell_lines += lines
+                else:
+                    writer.advance(lines)
+                place(_paragraph_block(fmt, pieces, style))
+                pieces = []
+                elem.clear()
+            elif tag == W_TC and tables:
+                table = tables[-1]
+                table.row_lines = max(table.row_lines, table.cell_lines)
+                _close_cell(fmt, table)
+                elem.clear()
+            elif tag == W_TR and tables:
+                table = tables[-1]
+                row, table.row = table.row, None
+                if len(tables) == 1:
+                    writer.advance(table.row_lines)  # a row that starts a new page is left out
+                else:
+                    tables[-2].cell_lines += table.row_lines
+                table.rows.append(row)
+                elem.clear()
+            elif tag == W_TBL and tables:
+                table = tables.pop()
+                place(_table_block(fmt, table.rows, table.style))
+                elem.clear()
+    except _PreviewLimit:
+        _close_tables(writer, tables)
+        raise
+
+
+def _footer_names(package):
+    names = [n for n in package.namelist() if n.startswith('word/footer') and n.endswith('.xml')]
+    return sorted(names, key=lambda n: (len(n), n))
+
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def extract_preview(source, fmt='text', max_pages=None, max_chars=None, cache=DEFAULT_CACHE):
+    """
+    Extract a text or HTML preview from a .docx file without python-docx.
+
+    Args:
+        source: Path to a .docx file or its bytes
+        fmt (str): 'text' or 'html'
+        max_pages (int): Stop after this many pages, counted from the page breaks the
+            document records or, if it has none, estimated from its line count
+        max_chars (int): Stop once this many characters of body text have been read
+        cache (PreviewCache): Cache to use, or None to always extract
+
+    Returns:
+        str: The preview; footers are appended after the body
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown preview format: {fmt}")
+
+    data = _read_bytes(source)
+    key = hashlib.sha256(data).hexdigest() + f"-v{CACHE_VERSION}-{fmt}-{max_pages}-{max_chars}"
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    writer = _Writer(fmt, max_pages, max_chars)
+    with zipfile.ZipFile(BytesIO(data)) as package:
+        try:
+            with package.open('word/document.xml') as stream:
+                _convert(stream, writer)
+        except _PreviewLimit:
+            pass
+        body = writer.blocks
+
+        footers = []
+        for name in _footer_names(package):
+            footer_writer = _Writer(fmt, None, None)
+            with package.open(name) as stream:
+                _convert(stream, footer_writer)
+            footers.extend(block for block in footer_writer.blocks if block)
+
+    if fmt == 'text':
+        preview = '\n'.join(body)
+        if footers:
+            preview += '\n\n' + '\n'.join(footers)
+    else:
+        preview = '\n'.join(body)
+        if footers:
+            preview += '\n<footer>' + ''.join(footers) + '</footer>'
+
+    if cache is not None:
+        cache.put(key, preview)
+    return preview
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python preview.py <document.docx> [text|html] [max_chars]")
+        sys.exit(2)
+    try:
+        fmt = sys.argv[2] if len(sys.argv) > 2 else 'text'
+        max_chars = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        print(extract_preview(sys.argv[1], fmt, max_chars=max_chars))
+    except Exception as e:
+        print(f"An error occurred while extracting the preview: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Render Scheduler
+Priority-aware dispatch of template renders in front of the Python builders.
+
+Interactive quotes must not wait behind a nightly batch of bulk renders.
+RenderScheduler keeps one queue per priority class and picks the next job by
+weighted fair queueing: each class advances a virtual clock inversely to its
+weight, so interactive work is served first while bulk work keeps a
+guaranteed share of the workers. Per-tenant concurrency caps stop one tenant
+from occupying every worker, jobs that are not started before their deadline
+fail with DeadlineExceeded, and metrics() reports queue depth and wait times.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Relative share of the workers each priority class receives under contention
+DEFAULT_CLASSES = {"interactive": 8, "bulk": 1}
+
+# Number of recent wait times kept per class for the percentile metrics
+WAIT_SAMPLES = 1024
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised on a job's future when it could not start before its deadline."""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "tenant", "priority", "deadline",
+                 "submitted", "finish_tag", "future", "queued")
+
+    def __init__(self, fn, args, kwargs, tenant, priority, deadline, finish_tag):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.tenant = tenant
+        self.priority = priority
+        self.deadline = deadline
+        self.submitted = time.monotonic()
+        self.finish_tag = finish_tag
+        self.future = Future()
+        self.queued = True
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class RenderScheduler:
+    """
+    Thread-based render scheduler with weighted fair queueing between classes.
+
+    Example:
+        scheduler = RenderScheduler(workers=4, tenant_limit=2)
+        future = scheduler.submit(build_sample_quote, tenant="acme",
+                                  priority="interactive", deadline=2.0)
+        template = future.result()
+    """
+
+    def __init__(self, workers=4, classes=None, tenant_limit=None, default_deadline=None):
+        """
+        Start the worker threads.
+
+        Args:
+            workers (int): Number of concurrent renders
+            classes (dict): Priority class name to weight, defaults to DEFAULT_CLASSES
+            tenant_limit (int): Maximum concurrent renders per tenant, None for no cap
+            default_deadline (float): Seconds a job may wait before it must start
+        """
+        self.classes = dict(classes or DEFAULT_CLASSES)
+        self.tenant_limit = tenant_limit
+        self.default_deadline = default_deadline
+
+        self._lock = threading.Condition()
+        self._queues = {name: deque() for name in self.classes}
+        self._last_finish = {name: 0.0 for name in self.classes}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._running = {}
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in self.classes}
+        self._deadlines = []
+        self._counts = {
+            name: {"completed": 0, "failed": 0, "cancelled": 0, "expired": 0}
+            for name in self.classes
+        }
+        self._shutdown = False
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"render-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        # Expires queued jobs on time even while every worker is busy
+        self._threads.append(threading.Thread(target=self._reaper, name="render-reaper", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args, tenant=None, priority="bulk", deadline=None, cost=1.0, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return a concurrent.futures.Future.
+
+        Args:
+            tenant (str): Tenant the job is charged to for the concurrency cap
+            priority (str): Priority class name
+            deadline (float): Seconds from now by which the job must have started
+            cost (float): Relative size of the job for fair queueing
+        """
+        if priority not in self.classes:
+            raise ValueError(f"Unknown priority class: {priority}")
+        deadline = self.default_deadline if deadline is None else deadline
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to a scheduler that has been shut down")
+            start = max(self._virtual_time, self._last_finish[priority])
+            finish_tag = start + cost / self.classes[priority]
+            self._last_finish[priority] = finish_tag
+            job = _Job(fn, args, kwargs, tenant, priority,
+                       None if deadline is None else time.monotonic() + deadline,
+                       (finish_tag, next(self._sequence)))
+            self._queues[priority].append(job)
+            if job.deadline is not None:
+                heapq.heappush(self._deadlines, (job.deadline, job.finish_tag[1], job))
+            self._lock.notify_all()
+        return job.future
+
+    def _eligible(self, job):
+        if self.tenant_limit is None or job.tenant is None:
+            return True
+        return self._running.get(job.tenant, 0) < self.tenant_limit
+
+    def _expire(self, now):
+        """Fail every queued job whose deadline has passed. Caller holds the lock."""
+        while self._deadlines and self._deadlines[0][0] < now:
+            _, _, job = heapq.heappop(self._deadlines)
+            if not job.queued:
+                continue
+            job.queued = False
+            self._queues[job.priority].remove(job)
+            self._counts[job.priority]["expired"] += 1
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(DeadlineExceeded(
+                    f"{job.priority} job for tenant {job.tenant} missed its deadline"))
+
+    def _next_job(self):
+        """Pop the eligible job with the smallest finish tag. Caller holds the lock."""
+        self._expire(time.monotonic())
+        best = None
+        for queue in self._queues.values():
+            for job in queue:
+                if self._eligible(job):
+                    if best is None or job.finish_tag < best.finish_tag:
+                        best = job
+                    break  # jobs within a class are already in finish-tag order
+        if best is not None:
+            best.queued = False
+            self._queues[best.priority].remove(best)
+            self._virtual_time = max(self._virtual_time, best.finish_tag[0])
+        return best
+
+    def _reaper(self):
+        """Fail queued jobs as their deadlines pass, independently of the workers."""
+        with self._lock:
+            while True:
+                self._expire(time.monotonic())
+                while self._deadlines and not self._deadlines[0][2].queued:
+                    heapq.heappop(self._deadlines)
+                if self._shutdown and not any(self._queues.values()):
+                    return
+                timeout = self._deadlines[0][0] - time.monotonic() if self._deadlines else None
+                self._lock.wait(timeout)
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._lock.wait(timeout=0.05)
+                    job = self._next_job()
+                if job.tenant is not None:
+                    self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+                self._waits[job.priority].append(time.monotonic() - job.submitted)
+
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    result = job.fn(*job.args, **job.kwargs)
+                except BaseException as e:
+                    job.future.set_exception(e)
+                    outcome = "failed"
+                else:
+                    job.future.set_result(result)
+                    outcome = "completed"
+            else:
+                outcome = "cancelled"
+
+            with self._lock:
+                if job.tenant is not None:
+                    self._running[job.tenant] -= 1
+                    if not self._running[job.tenant]:
+                        del self._running[job.tenant]
+                self._counts[job.priority][outcome] += 1
+                self._lock.notify_all()
+
+    def metrics(self):
+        """
+        Return a snapshot of queue depths, running jobs and wait times.
+
+        Wait times are in milliseconds over the most recent WAIT_SAMPLES
+        dispatches of each class.
+        """
+        with self._lock:
+            result = {"running": dict(self._running), "classes": {}}
+            for name in self.classes:
+                waits = [w * 1000 for w in self._waits[name]]
+                result["classes"][name] = {
+                    "queue_depth": len(self._queues[name]),
+                    "wait_ms_p50": _percentile(waits, 0.50),
+                    "wait_ms_p99": _percentile(waits, 0.99),
+                    "wait_ms_max": max(waits, default=0.0),
+                    **self._counts[name],
+                }
+            return result
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs; workers exit once the queues are drained."""
+        with self._lock:
+            self._shutdown = True
+            self._lock.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Declarative Template Specs
+Compiles JSON (or YAML) template specs into flat build plans and replays them.
+
+A spec describes styles, body blocks and the footer of a template. The compiler
+resolves 'extends' chains and parameters and turns the spec into a flat list of
+operations. Compiled plans are cached on disk keyed by the hash of the resolved
+spec, so building a template only means replaying a cached plan. Parameters
+stay as references in the plan and are substituted on replay, so one plan
+serves every set of parameter values.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+
+SPEC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specs")
+CACHE_DIR = os.path.join(SPEC_DIR, ".cache")
+
+# Bump whenever the plan format or the compiler output changes.
+COMPILER_VERSION = 2
+
+ALIGNMENTS = ("left", "center", "right", "justify")
+STYLE_TYPES = ("paragraph", "character", "table")
+RUN_FORMATS = ("bold", "italic", "size")
+
+
+def load_spec_file(path):
+    """Load a raw spec from a .json, .yaml or .yml file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"PyYAML is required to load YAML spec {path}: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def spec_sources(path):
+    """Return the spec file followed by every file in its 'extends' chain."""
+    sources = []
+    while path:
+        path = os.path.abspath(path)
+        if path in sources:
+            raise ValueError(f"Circular 'extends' in spec {path}")
+        sources.append(path)
+        parent = load_spec_file(path).get("extends")
+        path = os.path.join(os.path.dirname(path), parent) if parent else None
+    return sources
+
+
+def resolve_spec(path, params=None):
+    """
+    Load a spec and merge it over its 'extends' chain.
+
+    Child specs replace top-level keys of their parent, except 'params' and
+    'styles' which are merged by key and style name respectively.
+    """
+    merged = {}
+    for source in reversed(spec_sources(path)):
+        raw = load_spec_file(source)
+        for key, value in raw.items():
+            if key == "extends":
+                continue
+            if key == "params":
+                merged.setdefault("params", {}).update(value)
+            elif key == "styles":
+                styles = {s["name"]: s for s in merged.get("styles", [])}
+                styles.update({s["name"]: s for s in value})
+                merged["styles"] = list(styles.values())
+            else:
+                merged[key] = value
+    if params:
+        merged.setdefault("params", {}).update(params)
+    return merged
+
+
+def spec_hash(spec):
+    """Hash a resolved spec together with the compiler version."""
+    payload = json.dumps({"compiler": COMPILER_VERSION, "spec": spec}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _compile_text(value):
+    """Compile a text value, keeping a {"param": name} reference for replay."""
+    if isinstance(value, dict):
+        return {"param": value.get("param")}
+    return str(value)
+
+
+def _resolve_text(value, params):
+    """Resolve a compiled text value against the replay parameters."""
+    if isinstance(value, dict):
+        name = value["param"]
+        if name not in params:
+            raise ValueError(f"Unknown spec parameter: {name}")
+        return str(params[name])
+    return value
+
+
+def _compile_runs(runs):
+    """Compile a paragraph's text or run list into run operations."""
+    if isinstance(runs, (str, dict)):
+        runs = [runs]
+    ops = []
+    for run in runs:
+        if isinstance(run, dict) and "date" in run:
+            fmt = {k: run[k] for k in RUN_FORMATS if k in run}
+            ops.append(("date_run", run["date"], fmt))
+        elif isinstance(run, dict) and "text" in run:
+            fmt = {k: run[k] for k in RUN_FORMATS if k in run}
+            ops.append(("run", _compile_text(run["text"]), fmt))
+        else:
+            ops.append(("run", _compile_text(run), {}))
+    return [op for op in ops if op[0] == "date_run" or op[1]]
+
+
+def _compile_align(block):
+    align = block.get("align")
+    if align is not None and align not in ALIGNMENTS:
+        raise ValueError(f"Unknown alignment: {align}")
+    return align
+
+
+def compile_spec(spec):
+    """
+    Compile a resolved spec into a flat build plan.
+
+    Args:
+        spec (dict): Spec as returned by resolve_spec()
+
+    Returns:
+        list: Plan operations as tuples, replayed in order by replay_plan().
+            The first sets the spec's default parameters; texts taken from
+            parameters stay {"param": name} references until replay.
+    """
+    plan = [("params", dict(spec.get("params", {})))]
+
+    for style in spec.get("styles", []):
+        kind = style.get("type", "paragraph")
+        if kind not in STYLE_TYPES:
+            raise ValueError(f"Unknown style type for {style['name']}: {kind}")
+        font = {k: style[k] for k in ("size", "bold", "italic", "color", "font") if k in style}
+        plan.append(("style", style["name"], kind, font))
+
+    for block in spec.get("body", []):
+        if "paragraph" in block:
+            plan.append(("paragraph", block.get("style"), _compile_align(block)))
+            plan.extend(_compile_runs(block["paragraph"]))
+        elif "table" in block:
+            rows = block["table"]
+            cols = max((len(row) for row in rows), default=0)
+            plan.append(("table", len(rows), cols, block.get("style")))
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    if isinstance(cell, dict) and "text" in cell:
+                        text = _compile_text(cell["text"])
+                        plan.append(("cell", r, c, text, cell.get("style"), cell.get("bold", False)))
+                    else:
+                        plan.append(("cell", r, c, _compile_text(cell), None, False))
+        else:
+            raise ValueError(f"Unknown spec block: {sorted(block)}")
+
+    footer = spec.get("footer")
+    if footer:
+        text = _compile_text(footer.get("text", ""))
+        plan.append(("footer", text, _compile_align(footer), bool(footer.get("page_number"))))
+
+    return plan
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.plan")
+
+
+def load_plan(path, cache_dir=CACHE_DIR):
+    """
+    Return the compiled plan for a spec file, compiling it only on a cache miss.
+
+    The cache is only an optimization: if the plan cannot be written, e.g. on
+    a read-only install, the freshly compiled plan is returned all the same.
+
+    Args:
+        path (str): Path to the spec file
+        cache_dir (str): Directory holding compiled plans
+
+    Returns:
+        list: The compiled build plan
+    """
+    spec = resolve_spec(path)
+    key = spec_hash(spec)
+    cache_path = _cache_path(key, cache_dir)
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    plan = compile_spec(spec)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return plan
+
+
+def _apply_font(font, props):
+    from docx.shared import Pt, RGBColor
+
+    if "size" in props:
+        font.size = Pt(props["size"])
+    if "bold" in props:
+        font.bold = props["bold"]
+    if "italic" in props:
+        font.italic = props["italic"]
+    if "color" in props:
+        font.color.rgb = RGBColor(*props["color"])
+    if "font" in props:
+        font.name = props["font"]
+
+
+def _add_page_number(paragraph):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    run = paragraph.add_run()
+    begin = OxmlElement('w:fldChar')
+    begin.set(qn('w:fldCharType'), 'begin')
+    instr = OxmlElement('w:instrText')
+    instr.set(qn('xml:space'), 'preserve')
+    instr.text = "PAGE"
+    end = OxmlElement('w:fldChar')
+    end.set(qn('w:fldCharType'), 'end')
+    run._r.append(begin)
+    run._r.append(instr)
+    run._r.append(end)
+
+
+def replay_plan(plan, doc=None, params=None):
+    """
+    Replay a compiled plan onto a python-docx Document and return it.
+
+    Args:
+        plan (list): Plan as returned by load_plan()
+        doc (Document): Document to build on, defaults to a new one
+        params (dict): Parameter overrides merged over the spec's params
+    """
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    alignments = {
+        "left": WD_ALIGN_PARAGRAPH.LEFT,
+        "center": WD_ALIGN_PARAGRAPH.CENTER,
+        "right": WD_ALIGN_PARAGRAPH.RIGHT,
+        "justify": WD_ALIGN_PARAGRAPH.JUSTIFY,
+    }
+    style_types = {
+        "paragraph": WD_STYLE_TYPE.PARAGRAPH,
+        "character": WD_STYLE_TYPE.CHARACTER,
+        "table": WD_STYLE_TYPE.TABLE,
+    }
+
+    doc = Document() if doc is None else doc
+    paragraph = table = None
+    values = {}
+
+    for op in plan:
+        kind = op[0]
+        if kind == "params":
+            values = {**op[1], **(params or {})}
+        elif kind == "style":
+            _, name, style_type, font = op
+            try:
+                style = doc.styles.add_style(name, style_types[style_type])
+            except ValueError:
+                style = doc.styles[name]
+            _apply_font(style.font, font)
+        elif kind == "paragraph":
+            _, style, align = op
+            paragraph = doc.add_paragraph(style=style)
+            if align:
+                paragraph.alignment = alignments[align]
+        elif kind in ("run", "date_run"):
+            _, text, fmt = op
+            if kind == "date_run":
+                text = datetime.now().strftime(text)
+            else:
+                text = _resolve_text(text, values)
+                if not text:
+                    continue
+            _apply_font(paragraph.add_run(text).font, fmt)
+        elif kind == "table":
+            _, rows, cols, style = op
+            table = doc.add_table(rows=rows, cols=cols)
+            if style:
+                table.style = style
+        elif kind == "cell":
+            _, r, c, text, style, bold = op
+            cell = table.cell(r, c)
+            cell.text = _resolve_text(text, values)
+            if style:
+                cell.paragraphs[0].style = style
+            if bold and cell.paragraphs[0].runs:
+                cell.paragraphs[0].runs[0].bold = True
+        elif kind == "footer":
+            _, text, align, page_number = op
+            footer_para = doc.sections[0].footer.paragraphs[0]
+            footer_para.text = _resolve_text(text, values)
+            if align:
+                footer_para.alignment = alignments[align]
+            if page_number:
+                _add_page_number(footer_para)
+        else:
+            raise ValueError(f"Unknown plan operation: {kind}")
+
+    return doc
+
+
+def build_from_spec(path, params=None, cache_dir=CACHE_DIR):
+    """Build a Document from a spec file, replaying a cached plan when possible."""
+    return replay_plan(load_plan(path, cache_dir), params=params)
+
+
+def find_specs(spec_dir=SPEC_DIR):
+    """Return the paths of every spec file in spec_dir, sorted by name."""
+    if not os.path.isdir(spec_dir):
+        return []
+    return sorted(
+        os.path.join(spec_dir, name)
+        for name in os.listdir(spec_dir)
+        if name.endswith((".json", ".yaml", ".yml"))
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python spec.py <spec file> <output.docx>")
+        sys.exit(2)
+    try:
+        from optimize import save_optimized
+
+        save_optimized(build_from_spec(sys.argv[1]), sys.argv[2])
+        print(f"Template saved to: {sys.argv[2]}")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        sys.exit(1)
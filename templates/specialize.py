@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Template Specialization
+Pre-evaluates Docxtemplater conditions whose inputs are known at build time.
+
+template.py emits the auto, home and life coverage blocks and every status
+message into each template, so every fill has to evaluate and discard branches
+that can never apply to that product line. Given known values such as
+policy_type="auto", specialize_document() resolves each {#expr}...{/expr}
+(and inverted {^expr}...{/expr}) section whose expression only depends on
+known values: true sections lose their tags, false sections are removed with
+their content. Conditions that reference unknown values are left intact.
+Specialized variants are cached on disk per set of known values.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from optimize import W, W_BR, W_P, W_R, W_RPR, W_T, W_TAB
+
+W_BODY = W + 'body'
+
+SECTION_TAG = re.compile(r'\{([#^/])([^{}]*)\}')
+COMPARISON = re.compile(r'^\s*([A-Za-z_][\w.]*)\s*(==|!=|>=|<=|>|<)\s*(.+?)\s*$')
+VARIABLE = re.compile(r'^\s*([A-Za-z_][\w.]*)\s*$')
+
+OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '<': lambda a, b: a < b,
+}
+
+_UNKNOWN = object()
+
+# Bump when specialization output changes so cached variants are rebuilt
+CACHE_VERSION = 3
+
+# Only these are resolved; Docxtemplater loops over lists and treats every
+# object (even an empty one) as truthy, so lists and dicts are left to the fill
+SCALARS = (bool, int, float, str, type(None))
+
+
+def _lookup(known, name):
+    """Resolve a (possibly dotted) name to a known scalar value, or _UNKNOWN."""
+    if name in known:
+        value = known[name]
+    else:
+        value = known
+        for part in name.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                return _UNKNOWN
+            value = value[part]
+    return value if isinstance(value, SCALARS) else _UNKNOWN
+
+
+def _literal(text):
+    """Parse a string, number or boolean literal from a condition."""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        return text[1:-1]
+    if text in ('true', 'false'):
+        return text == 'true'
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return _UNKNOWN
+
+
+def _comparable(a, b):
+    """
+    True if Python and JavaScript compare a and b the same way.
+
+    Docxtemplater compares with loose equality ("1" == 1 is true there), so
+    only two numbers or two strings are compared at build time.
+    """
+    def number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    return (number(a) and number(b)) or (isinstance(a, str) and isinstance(b, str))
+
+
+def evaluate(expression, known):
+    """
+    Evaluate a condition against known values.
+
+    Returns:
+        True or False, or None if the expression depends on an unknown or
+        non-scalar value, compares values of different types, or is not a
+        simple comparison
+    """
+    match = COMPARISON.match(expression)
+    if match:
+        name, operator, literal = match.groups()
+        value, expected = _lookup(known, name), _literal(literal)
+        if value is _UNKNOWN or expected is _UNKNOWN or not _comparable(value, expected):
+            return None
+        return bool(OPERATORS[operator](value, expected))
+    match = VARIABLE.match(expression)
+    if match:
+        value = _lookup(known, match.group(1))
+        if value is _UNKNOWN:
+            return None
+        return bool(value) and value == value  # NaN is falsy in JavaScript
+    return None
+
+
+def _paragraph_atoms(paragraph):
+    """
+    Flatten a paragraph's run content into (element, index) atoms and their text.
+
+    Each character of a w:t is one atom; a w:br or w:tab is one atom of its own.
+    """
+    atoms, chars = [], []
+    for run in paragraph.iter(W_R):
+        for child in run:
+            if child.tag == W_T:
+                for i, char in enumerate(child.text or ''):
+                    atoms.append((child, i))
+                    chars.append(char)
+            elif child.tag in (W_BR, W_TAB):
+                atoms.append((child, None))
+                chars.append('\n' if child.tag == W_BR else '\t')
+    return atoms, ''.join(chars)
+
+
+def _dead_ranges(text, known):
+    """Return the (start, end) character ranges to delete and the number of resolved sections."""
+    ranges, stack, resolved = [], [], 0
+    for match in SECTION_TAG.finditer(text):
+        kind, expression = match.group(1), match.group(2)
+        if kind in '#^':
+            stack.append((kind, expression, match))
+            continue
+        if not stack or stack[-1][1] != expression:
+            return [], 0  # unbalanced or spans paragraphs: leave the paragraph alone
+        open_kind, _, opening = stack.pop()
+        result = evaluate(expression, known)
+        if result is None:
+            continue
+        if open_kind == '^':
+            result = not result
+        resolved += 1
+        if result:
+            ranges.append(opening.span())
+            ranges.append(match.span())
+        else:
+            ranges.append((opening.start(), match.end()))
+    return ([], 0) if stack else (ranges, resolved)
+
+
+def _removable(paragraph):
+    """A w:p can go unless it is the last one its table cell, header or footer must keep."""
+    parent = paragraph.getparent()
+    if parent is None:
+        return False
+    if parent.tag == W_BODY:
+        return True
+    return sum(1 for child in parent if child.tag == W_P) > 1
+
+
+def specialize_paragraph(paragraph, known):
+    """
+    Resolve the known conditions of one w:p in place; return how many were resolved.
+
+    A paragraph whose whole content was resolved away is removed rather than
+    left behind as a blank line.
+    """
+    atoms, text = _paragraph_atoms(paragraph)
+    ranges, resolved = _dead_ranges(text, known)
+    if not ranges:
+        return 0
+
+    dead = set()
+    for start, end in ranges:
+        dead.update(range(start, end))
+    if len(dead) == len(atoms) and _removable(paragraph):
+        paragraph.getparent().remove(paragraph)
+        return resolved
+
+    removed_chars = {}
+    for position in sorted(dead):
+        element, index = atoms[position]
+        if index is None:
+            element.getparent().remove(element)
+        else:
+            removed_chars.setdefault(element, set()).add(index)
+    for t, indexes in removed_chars.items():
+        t.text = ''.join(c for i, c in enumerate(t.text) if i not in indexes)
+        if not t.text:
+            t.getparent().remove(t)
+
+    for run in list(paragraph.iter(W_R)):
+        if all(child.tag == W_RPR for child in run):
+            run.getparent().remove(run)
+    return resolved
+
+
+def specialize_document(doc, known):
+    """
+    Resolve every condition that only depends on known values.
+
+    Args:
+        doc: python-docx Document built from a conditional template
+        known (dict): Values known at build time, e.g. {"policy_type": "auto"}
+
+    Returns:
+        int: Number of conditional sections resolved
+    """
+    resolved = 0
+    parts = [doc.part.element]
+    for section in doc.sections:
+        for part in (section.header, section.footer):
+            if not part.is_linked_to_previous:
+                parts.append(part._element)
+    for element in parts:
+        for paragraph in list(element.iter(W_P)):
+            resolved += specialize_paragraph(paragraph, known)
+    return resolved
+
+
+def variant_key(source_bytes, known):
+    """Cache key of a specialized variant: the base template, the known values and CACHE_VERSION."""
+    digest = hashlib.sha256(source_bytes)
+    digest.update(f"v{CACHE_VERSION}".encode('ascii'))
+    digest.update(json.dumps(known, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def specialize_template(template_path, known, cache_dir=os.path.join("output", "specialized")):
+    """
+    Return the path of template_path specialized for known, building it on a cache miss.
+
+    Args:
+        template_path (str): Conditional .docx template, e.g. from template.save_template()
+        known (dict): Values known at build time
+        cache_dir (str): Directory holding the specialized variants
+    """
+    with open(template_path, 'rb') as f:
+        source = f.read()
+    variant_path = os.path.join(cache_dir, f"{variant_key(source, known)}.docx")
+    if os.path.exists(variant_path):
+        return variant_path
+
+    from io import BytesIO
+    from docx import Document
+    from optimize import save_optimized
+
+    doc = Document(BytesIO(source))
+    specialize_document(doc, known)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+    save_optimized(doc, tmp_path)
+    os.replace(tmp_path, variant_path)
+    return variant_path
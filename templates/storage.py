@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Sharded Output Storage
+Stores generated documents in a date and hash-prefix sharded tree with an index.
+
+A flat output/ directory slows down badly once it holds hundreds of thousands
+of files. DocumentStore writes each document to <root>/<YYYY>/<MM>/<DD>/<ab>/
+using its content hash as the file name, so no directory grows without bound.
+An append-only SQLite index answers lookups by client, policy or template
+through indexed queries, and retention-based garbage collection walks the
+index oldest first in small batches instead of scanning the tree.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+
+INDEX_NAME = "index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    template TEXT,
+    client TEXT,
+    policy TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tombstones (
+    document_id INTEGER PRIMARY KEY,
+    removed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gc_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    watermark REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_client ON documents (client, created_at);
+CREATE INDEX IF NOT EXISTS documents_policy ON documents (policy, created_at);
+CREATE INDEX IF NOT EXISTS documents_template ON documents (template, created_at);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256);
+CREATE INDEX IF NOT EXISTS documents_created ON documents (created_at);
+"""
+
+LIVE = "NOT EXISTS (SELECT 1 FROM tombstones t WHERE t.document_id = d.id)"
+
+COLUMNS = ("id", "sha256", "path", "template", "client", "policy", "size", "created_at")
+
+
+class DocumentStore:
+    """
+    Sharded, indexed storage for generated documents.
+
+    Documents are content addressed: storing the same bytes twice on the same
+    day reuses the file and only appends another index row.
+    """
+
+    def __init__(self, root="output"):
+        """Open (or create) a store rooted at the given directory."""
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, INDEX_NAME))
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the index database."""
+        self._db.close()
+
+    def shard_path(self, sha256, created_at):
+        """Return the store-relative path for a document hash and creation time."""
+        day = datetime.fromtimestamp(created_at, tz=timezone.utc)
+        return os.path.join(day.strftime("%Y"), day.strftime("%m"), day.strftime("%d"),
+                            sha256[:2], f"{sha256}.docx")
+
+    def put_bytes(self, data, template=None, client=None, policy=None, created_at=None):
+        """
+        Store document bytes and record them in the index.
+
+        Args:
+            data (bytes): The .docx package
+            template (str): Name of the template the document was built from
+            client (str): Client identifier for lookups
+            policy (str): Policy or quote number for lookups
+            created_at (float): Unix timestamp, defaults to now
+
+        Returns:
+            dict: The index record of the stored document
+        """
+        created_at = time.time() if created_at is None else created_at
+        sha256 = hashlib.sha256(data).hexdigest()
+        rel_path = self.shard_path(sha256, created_at)
+        full_path = os.path.join(self.root, rel_path)
+
+        # Insert the row and write the file under one write lock. gc() checks
+        # for live rows under the same lock, so it cannot remove the file
+        # between the existence check and the insert.
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            cursor = self._db.execute(
+                "INSERT INTO documents (sha256, path, template, client, policy, size, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, rel_path, template, client, policy, len(data), created_at),
+            )
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, full_path)
+        return dict(zip(COLUMNS, (cursor.lastrowid, sha256, rel_path, template, client, policy,
+                                  len(data), created_at)))
+
+    def put_file(self, path, **metadata):
+        """Store an existing .docx file; see put_bytes() for the metadata arguments."""
+        with open(path, "rb") as f:
+            return self.put_bytes(f.read(), **metadata)
+
+    def put_document(self, doc, optimize=True, minimal=False, **metadata):
+        """Save a python-docx Document into the store; see put_bytes() for the metadata."""
+        from io import BytesIO
+        from optimize import save_optimized
+
+        buffer = BytesIO()
+        save_optimized(doc, buffer, optimize, minimal)
+        return self.put_bytes(buffer.getvalue(), **metadata)
+
+    def lookup(self, client=None, policy=None, template=None, limit=None):
+        """
+        Return live index records matching every given key, newest first.
+
+        Args:
+            client (str): Client identifier
+            policy (str): Policy or quote number
+            template (str): Template name
+            limit (int): Maximum number of records to return
+        """
+        clauses, params = [LIVE], []
+        for column, value in (("client", client), ("policy", policy), ("template", template)):
+            if value is not None:
+                clauses.append(f"d.{column} = ?")
+                params.append(value)
+        query = f"SELECT {', '.join(COLUMNS)} FROM documents d WHERE {' AND '.join(clauses)}" \
+                " ORDER BY d.created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(zip(COLUMNS, row)) for row in self._db.execute(query, params)]
+
+    def open_path(self, record):
+        """Return the absolute path of a stored document record."""
+        return os.path.join(self.root, record["path"])
+
+    def gc(self, retention_days, batch_size=500, now=None, full=False):
+        """
+        Remove documents older than the retention period, oldest first.
+
+        Each call handles at most batch_size records through the created_at
+        index, resuming from the watermark the previous batch left behind, so
+        it can run incrementally from cron without walking the tree. Files
+        still referenced by a younger record are kept. Records backfilled with
+        a created_at below the watermark are only seen by a full=True pass.
+
+        Returns:
+            int: Number of index records removed in this batch
+        """
+        now = time.time() if now is None else now
+        cutoff = now - retention_days * 86400
+        # Everything from the select to the unlinks happens under one write
+        # lock, so overlapping gc runs and put_bytes() calls queue behind it.
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            state = self._db.execute("SELECT watermark FROM gc_state WHERE id = 1").fetchone()
+            watermark = state[0] if state and not full else float("-inf")
+            rows = self._db.execute(
+                "SELECT d.id, d.sha256, d.path, d.created_at FROM documents d"
+                f" WHERE d.created_at >= ? AND d.created_at < ? AND {LIVE}"
+                " ORDER BY d.created_at LIMIT ?",
+                (watermark, cutoff, int(batch_size)),
+            ).fetchall()
+            if not rows:
+                return 0
+
+            removed = [
+                row for row in rows
+                if self._db.execute(
+                    "INSERT OR IGNORE INTO tombstones (document_id, removed_at) VALUES (?, ?)",
+                    (row[0], now),
+                ).rowcount
+            ]
+            self._db.execute(
+                "INSERT OR REPLACE INTO gc_state (id, watermark) VALUES (1, ?)", (rows[-1][3],)
+            )
+
+            for _, sha256, rel_path, _ in removed:
+                still_used = self._db.execute(
+                    f"SELECT 1 FROM documents d WHERE d.sha256 = ? AND d.path = ? AND {LIVE} LIMIT 1",
+                    (sha256, rel_path),
+                ).fetchone()
+                if not still_used:
+                    self._remove_file(rel_path)
+        return len(removed)
+
+    def _remove_file(self, rel_path):
+        """Delete a stored file and prune the shard directories it leaves empty."""
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            os.remove(full_path)
+        except FileNotFoundError:
+            pass
+        directory = os.path.dirname(full_path)
+        root = os.path.abspath(self.root)
+        while os.path.abspath(directory) != root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Shared Compiled-Template Store
+Publishes compiled templates into one memory-mappable file shared by all workers.
+
+Each worker used to rebuild or reparse the same templates before its first
+render. publish() writes every compiled template into a single store file with
+a small binary index and page-aligned payloads, then atomically swaps it into
+place. Workers open it with TemplateStore, which maps the file read-only: the
+kernel shares its pages between processes, reading a template is a slice of
+the mapping, and refresh() picks up a newly published generation while
+readers of the previous one keep a valid mapping until they let go of it.
+Packages are published with their parts stored uncompressed (stored_package),
+so part() hands a worker document.xml or styles.xml straight from the shared
+pages, with no per-process decompression or copy.
+
+File layout (little endian):
+    header   magic 'PFTS', format u32, generation u64, entry count u32
+    index    per entry: name length u16, name, offset u64, length u64, sha256
+    payload  template bytes, each starting on a PAGE_SIZE boundary
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zipfile
+
+MAGIC = b'PFTS'
+FORMAT_VERSION = 1
+PAGE_SIZE = mmap.PAGESIZE
+
+HEADER = struct.Struct('<4sIQI')
+ENTRY = struct.Struct('<QQ32s')
+NAME_LENGTH = struct.Struct('<H')
+ZIP_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+
+
+def _align(offset):
+    return (offset + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+
+
+def stored_package(data):
+    """Rewrite a .docx package with every part stored uncompressed, so it can be read in place."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, \
+            zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as target:
+        for info in source.infolist():
+            copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            copy.external_attr = info.external_attr
+            target.writestr(copy, source.read(info))
+    return buffer.getvalue()
+
+
+def read_generation(path):
+    """Return the generation of the store at path, or 0 if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, generation, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return 0
+    return generation
+
+
+def publish(path, templates):
+    """
+    Atomically publish a new generation of the store.
+
+    Args:
+        path (str): Store file that workers map
+        templates (dict): Template name to compiled template bytes
+
+    Returns:
+        int: The generation number that was published
+    """
+    generation = read_generation(path) + 1
+    names = sorted(templates)
+    encoded = [name.encode('utf-8') for name in names]
+    index_size = sum(NAME_LENGTH.size + len(name) + ENTRY.size for name in encoded)
+
+    offset = _align(HEADER.size + index_size)
+    entries = []
+    for name in names:
+        data = bytes(templates[name])
+        entries.append((offset, len(data), hashlib.sha256(data).digest()))
+        offset = _align(offset + len(data))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(names)))
+            for name, entry in zip(encoded, entries):
+                f.write(NAME_LENGTH.pack(len(name)) + name + ENTRY.pack(*entry))
+            for name, (entry_offset, _, _) in zip(names, entries):
+                f.seek(entry_offset)
+                f.write(templates[name])
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)  # workers may run as another user
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return generation
+
+
+class _MappedReader(io.RawIOBase):
+    """Seekable read-only file object over a memoryview, without copying it."""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._view[self._position:self._position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+class TemplateStore:
+    """
+    Read-only view of a published store, shared between worker processes.
+
+    Example:
+        store = TemplateStore('output/templates.pfts')
+        doc = Document(store.open('policy'))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._stat = None
+        self._index = {}
+        self._parts = {}
+        self.generation = 0
+        self._load()
+
+    def _load(self):
+        f = open(self.path, 'rb')
+        try:
+            stat = os.fstat(f.fileno())
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            f.close()
+            raise
+
+        magic, version, generation, count = HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC:
+            mapping.close()
+            f.close()
+            raise ValueError(f"Not a template store: {self.path}")
+        if version != FORMAT_VERSION:
+            mapping.close()
+            f.close()
+            raise ValueError(f"Unsupported template store format {version}: {self.path}")
+
+        index, position = {}, HEADER.size
+        for _ in range(count):
+            (length,) = NAME_LENGTH.unpack_from(mapping, position)
+            position += NAME_LENGTH.size
+            name = bytes(mapping[position:position + length]).decode('utf-8')
+            position += length
+            index[name] = ENTRY.unpack_from(mapping, position)
+            position += ENTRY.size
+
+        self.close()
+        self._file, self._map, self._stat = f, mapping, stat
+        self._index, self.generation = index, generation
+        self._parts = {}
+
+    def refresh(self):
+        """Remap the store if a new generation was published; return True if it was."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_ino, stat.st_dev) == (self._stat.st_ino, self._stat.st_dev):
+            return False
+        self._load()
+        return True
+
+    def names(self):
+        """Return the names of the templates in the current generation."""
+        return sorted(self._index)
+
+    def digest(self, name):
+        """Return the hex sha256 of a template, usable as a cache key."""
+        return self._index[name][2].hex()
+
+    def get(self, name):
+        """Return a zero-copy memoryview of a template's bytes."""
+        try:
+            offset, length, _ = self._index[name]
+        except KeyError:
+            raise KeyError(f"Template not in store generation {self.generation}: {name}")
+        return memoryview(self._map)[offset:offset + length]
+
+    def open(self, name):
+        """Return a seekable file object over a template, e.g. for Document() or zipfile."""
+        return io.BufferedReader(_MappedReader(self.get(name)))
+
+    def part(self, name, part_name):
+        """
+        Return one part of a template, e.g. 'word/document.xml'.
+
+        Parts of packages published through stored_package() come back as a
+        zero-copy memoryview of the mapping; compressed parts are inflated
+        into a new bytes object instead.
+        """
+        parts = self._parts.get(name)
+        if parts is None:
+            with zipfile.ZipFile(self.open(name)) as package:
+                parts = {info.filename: info for info in package.infolist()}
+            self._parts[name] = parts
+        try:
+            info = parts[part_name]
+        except KeyError:
+            raise KeyError(f"Template {name} has no part {part_name}")
+        if info.compress_type != zipfile.ZIP_STORED:
+            with zipfile.ZipFile(self.open(name)) as package:
+                return package.read(info)
+
+        view = self.get(name)
+        header = ZIP_LOCAL_HEADER.unpack_from(view, info.header_offset)
+        start = info.header_offset + ZIP_LOCAL_HEADER.size + header[-2] + header[-1]
+        return view[start:start + info.compress_size]
+
+    def close(self):
+        """Release the current mapping; views handed out earlier keep it alive."""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # still exported through a memoryview; freed when that is released
+            self._file.close()
+        self._map = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python template_store.py <store file> <template.docx> [...]")
+        sys.exit(2)
+    try:
+        templates = {}
+        for template_path in sys.argv[2:]:
+            with open(template_path, 'rb') as f:
+                templates[os.path.splitext(os.path.basename(template_path))[0]] = stored_package(f.read())
+        generation = publish(sys.argv[1], templates)
+        print(f"Published generation {generation} with {len(templates)} templates to {sys.argv[1]}")
+    except Exception as e:
+        print(f"An error occurred while publishing the store: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Quote Delta Tests
+Round trips, delta sizes and diff cost for delta.py and QuoteHistory.
+
+The large-quote cases use synthetic document.xml parts so they run in well
+under a second each; one case builds a real quote with InsuranceQuoteTemplate.
+Run with: python -m unittest test_delta  (or pytest)
+"""
+
+import random
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import delta
+
+W_BODY = b'<?xml version="1.0"?><w:document xmlns:w="w"><w:body>'
+
+# Seconds make_delta may take on a quote with 1,000 coverage rows and 5,000 terms
+LARGE_QUOTE_BUDGET = 2.0
+
+
+def quote_package(reference, rows=10, terms=50, premium=lambda i: 100 + i):
+    """Return a package shaped like an InsuranceQuoteTemplate quote."""
+    body = [W_BODY, b'<w:p><w:r><w:t>Quote Reference: %s</w:t></w:r></w:p><w:tbl><w:tblPr/>'
+            % reference.encode()]
+    for i in range(rows):
+        body.append(b'<w:tr><w:tc><w:p><w:r><w:t>Coverage %d</w:t></w:r></w:p></w:tc>'
+                    b'<w:tc><w:p><w:r><w:t>$%d.00</w:t></w:r></w:p></w:tc></w:tr>' % (i, premium(i)))
+    body.append(b'</w:tbl><w:p><w:r><w:t>Terms and Conditions</w:t></w:r></w:p>')
+    for i in range(terms):
+        body.append(b'<w:p><w:r><w:t>term %d</w:t></w:r></w:p><w:p/>' % i)
+    body.append(b'<w:sectPr/></w:body></w:document>')
+    return delta.write_parts([
+        ('[Content_Types].xml', 8, b'<Types/>'),
+        ('word/document.xml', 8, b''.join(body)),
+        ('word/styles.xml', 8, b'<w:styles>' + b'<w:style/>' * 500 + b'</w:styles>'),
+        ('docProps/thumbnail.jpeg', 0, bytes(range(256)) * 8),
+    ])
+
+
+class DeltaTest(unittest.TestCase):
+    def assertRoundTrip(self, base, target):
+        encoded = delta.make_delta(base, target)
+        self.assertEqual(delta.apply_delta(base, encoded), delta.normalize_package(target))
+        return encoded
+
+    def test_reference_change_is_small(self):
+        base, target = quote_package('QT-1'), quote_package('QT-2')
+        encoded = self.assertRoundTrip(base, target)
+        self.assertLess(len(encoded), len(target) / 10)
+
+    def test_large_quote_diffs_quickly(self):
+        base = quote_package('QT-1', rows=1000, terms=5000)
+        for target in (quote_package('QT-2', rows=1000, terms=5000),
+                       quote_package('QT-1', rows=1000, terms=5000, premium=lambda i: 200 + i)):
+            start = time.perf_counter()
+            self.assertRoundTrip(base, target)
+            self.assertLess(time.perf_counter() - start, LARGE_QUOTE_BUDGET)
+
+    def test_added_removed_and_reordered_content(self):
+        base = quote_package('QT-1', rows=20, terms=40)
+        for target in (quote_package('QT-1', rows=25, terms=40),
+                       quote_package('QT-1', rows=5, terms=10),
+                       quote_package('QT-1', rows=20, terms=40, premium=lambda i: 100 - i)):
+            self.assertRoundTrip(base, target)
+
+    def test_repetitive_and_shuffled_parts(self):
+        random.seed(7)
+        blocks = [random.choice([b'<w:p>a</w:p>', b'<w:p/>', b'<w:p>%d</w:p>' % i]) for i in range(5000)]
+        base = delta.write_parts([('word/document.xml', 8, b''.join(blocks))])
+        random.shuffle(blocks)
+        self.assertRoundTrip(base, delta.write_parts([('word/document.xml', 8, b''.join(blocks))]))
+
+    def test_added_and_removed_parts(self):
+        base = delta.write_parts([('a.xml', 8, b'<a/>'), ('b.bin', 0, b'\x00' * 10)])
+        target = delta.write_parts([('a.xml', 8, b'<a/>'), ('c.xml', 8, b'<c/>')])
+        self.assertRoundTrip(base, target)
+
+    def test_wrong_base_is_rejected(self):
+        encoded = delta.make_delta(quote_package('QT-1'), quote_package('QT-2'))
+        with self.assertRaises(ValueError):
+            delta.apply_delta(quote_package('QT-3'), encoded)
+
+    def test_rendered_quote(self):
+        from enhance import build_quote
+
+        record = {
+            'company_info': {'name': 'ABC Insurance Company'},
+            'quote_data': {'reference': 'QT-2024-001'},
+            'coverage_items': [{'type': 'Collision', 'amount': 50000, 'premium': 600}],
+        }
+        stamp = datetime(2024, 1, 1)
+        base = build_quote(record).package_bytes(timestamp=stamp)
+        self.assertEqual(base, build_quote(record).package_bytes(timestamp=stamp))
+        record['coverage_items'][0]['premium'] = 650
+        target = build_quote(record).package_bytes(timestamp=stamp)
+        encoded = self.assertRoundTrip(base, target)
+        self.assertLess(len(encoded), len(target) / 10)
+
+
+class QuoteHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_every_version_rebuilds(self):
+        history = delta.QuoteHistory(self.root, keyframe_interval=4)
+        packages = [quote_package('QT-1', premium=lambda i, v=v: 100 + i + (v if i == 3 else 0)) for v in range(10)]
+        stored = [history.add('QT-1', package) for package in packages]
+
+        self.assertEqual(history.versions('QT-1'), list(range(1, 11)))
+        self.assertEqual([record['keyframe'] for record in stored],
+                         [True, False, False, False] * 2 + [True, False])
+        for version, package in enumerate(packages, 1):
+            self.assertEqual(history.get('QT-1', version), delta.normalize_package(package))
+        self.assertEqual(history.get('QT-1'), delta.normalize_package(packages[-1]))
+
+        full = sum(len(package) for package in packages)
+        self.assertLess(sum(record['stored'] for record in stored), full / 2)
+        self.assertTrue(all(record['stored'] < len(packages[0]) / 10
+                            for record in stored if not record['keyframe']))
+
+    def test_invalid_reference(self):
+        history = delta.QuoteHistory(self.root)
+        for reference in ('', '..', '../escaped', 'a/b', 42, None):
+            with self.assertRaises(ValueError):
+                history.add(reference, quote_package('QT-1'))
+
+    def test_missing_version(self):
+        history = delta.QuoteHistory(self.root)
+        history.add('QT-1', quote_package('QT-1'))
+        with self.assertRaises(KeyError):
+            history.get('QT-1', 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Document Optimizer Tests
+Tag joining, run coalescing and redundant property removal in optimize.py.
+
+Paragraphs and style sheets are parsed from small WordprocessingML snippets,
+so each case shows exactly which runs and properties the pass may touch.
+Run with: python -m unittest test_optimize  (or pytest)
+"""
+
+import re
+import unittest
+
+from lxml import etree
+
+import optimize
+
+NAMESPACE = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def parse(xml):
+    """Parse a snippet whose root element uses the w: prefix."""
+    return etree.fromstring(re.sub(r'^<(w:\w+)', rf'<\1 {NAMESPACE}', xml, count=1))
+
+
+def styles(*style_xml, defaults=''):
+    """Return a StyleSheet for the given w:style snippets and docDefaults run properties."""
+    return optimize.StyleSheet(parse(
+        f'<w:styles><w:docDefaults><w:rPrDefault><w:rPr>{defaults}</w:rPr></w:rPrDefault>'
+        f'</w:docDefaults>{"".join(style_xml)}</w:styles>'))
+
+
+def runs(paragraph):
+    """Return (text, run property tags) for every run of a paragraph, breaks as '\\n'."""
+    result = []
+    for run in paragraph.iter(optimize.W_R):
+        text = ''.join(optimize.CONTENT_TEXT.get(child.tag, child.text or '')
+                       for child in run if child.tag in optimize.TEXT_CONTENT)
+        rpr = run.find(optimize.W_RPR)
+        props = [] if rpr is None else [etree.QName(prop).localname for prop in rpr]
+        result.append((text, props))
+    return result
+
+
+def properties(element):
+    """Return the local names of every direct run property below an element."""
+    return [etree.QName(prop).localname for rpr in element.iter(optimize.W_RPR) for prop in rpr]
+
+
+class JoinTagsTest(unittest.TestCase):
+    def test_split_tag_moves_into_first_run(self):
+        paragraph = parse(
+            '<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Dear {first_</w:t></w:r>'
+            '<w:r><w:rPr><w:i/></w:rPr><w:t>na</w:t></w:r>'
+            '<w:r><w:rPr><w:u w:val="single"/></w:rPr><w:t xml:space="preserve">me}, hello</w:t></w:r></w:p>')
+        optimize.optimize_paragraph(paragraph)
+        self.assertEqual(runs(paragraph), [('Dear {first_name}', ['b']), (', hello', ['u'])])
+
+    def test_tag_across_break_is_not_joined(self):
+        paragraph = parse(
+            '<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>{a</w:t><w:br/></w:r>'
+            '<w:r><w:rPr><w:i/></w:rPr><w:t>b}</w:t><w:tab/><w:t>{c</w:t></w:r>'
+            '<w:r><w:t>d}</w:t></w:r></w:p>')
+        optimize.optimize_paragraph(paragraph)
+        self.assertEqual(runs(paragraph), [('{a\n', ['b']), ('b}\t{cd}', ['i'])])
+
+    def test_same_formatting_is_coalesced(self):
+        paragraph = parse(
+            '<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>One </w:t></w:r>'
+            '<w:r><w:rPr><w:b/></w:rPr><w:t>{two}</w:t></w:r><w:r><w:t/></w:r></w:p>')
+        optimize.optimize_paragraph(paragraph)
+        self.assertEqual(runs(paragraph), [('One {two}', ['b'])])
+
+
+class RedundantPropertiesTest(unittest.TestCase):
+    HEADING = ('<w:style w:type="paragraph" w:styleId="Base"><w:rPr>{base}</w:rPr></w:style>'
+               '<w:style w:type="paragraph" w:styleId="Heading"><w:basedOn w:val="Base"/>'
+               '<w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>')
+
+    def heading(self, run_properties):
+        return parse(f'<w:p><w:pPr><w:pStyle w:val="Heading"/></w:pPr>'
+                     f'<w:r><w:rPr>{run_properties}</w:rPr><w:t>Title</w:t></w:r></w:p>')
+
+    def test_property_repeating_the_style_is_dropped(self):
+        paragraph = self.heading('<w:b/><w:sz w:val="32"/><w:color w:val="FF0000"/>')
+        optimize.optimize_paragraph(paragraph, styles(self.HEADING.format(base='')))
+        self.assertEqual(properties(paragraph), ['color'])
+
+    def test_toggle_on_several_levels_is_kept(self):
+        # Bold on both Base and Heading toggles off again; the direct w:b decides
+        paragraph = self.heading('<w:b/>')
+        optimize.optimize_paragraph(paragraph, styles(self.HEADING.format(base='<w:b/>')))
+        self.assertEqual(properties(paragraph), ['b'])
+
+    def test_table_with_conditional_style_is_not_touched(self):
+        cell = ('<w:tbl><w:tblPr><w:tblStyle w:val="{style}"/></w:tblPr><w:tr><w:tc>'
+                '<w:p><w:r><w:rPr><w:sz w:val="22"/><w:b w:val="0"/></w:rPr><w:t>x</w:t></w:r></w:p>'
+                '</w:tc></w:tr></w:tbl>')
+        sheet = styles(
+            '<w:style w:type="table" w:styleId="Plain"/>'
+            '<w:style w:type="table" w:styleId="Banded"><w:tblStylePr w:type="firstRow">'
+            '<w:rPr><w:b/></w:rPr></w:tblStylePr></w:style>',
+            defaults='<w:sz w:val="22"/>')
+
+        plain = parse(cell.format(style='Plain'))
+        optimize.minify_element(plain, sheet)
+        self.assertEqual(properties(plain), [])
+
+        banded = parse(cell.format(style='Banded'))
+        optimize.minify_element(banded, sheet)
+        self.assertEqual(properties(banded), ['sz', 'b'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup Regression Test
+Keeps importing the template modules and running their CLIs cheap.
+
+Each module is imported in a fresh interpreter with -X importtime; the test
+fails if python-docx or lxml is loaded at import time, if importing changes
+the process locale, or if the cumulative import time exceeds the budget.
+Run with: python -m unittest test_startup  (or pytest)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ("template", "generator", "insurance_template", "enhance", "optimize",
+           "specialize", "spec", "build", "delta")
+
+# Heavy dependencies that must only be imported once a document is built
+DEFERRED = ("docx", "lxml")
+
+# Cumulative import time allowed per module, in milliseconds. Importing
+# python-docx alone takes well over this on a typical machine.
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 60))
+
+# Wall time allowed for `python build.py --help`, including interpreter startup
+HELP_BUDGET_MS = float(os.environ.get("STARTUP_HELP_BUDGET_MS", 400))
+
+
+def _run(args):
+    return subprocess.run([sys.executable] + args, cwd=BASE_DIR, capture_output=True,
+                          text=True, check=True)
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        tuple: (cumulative import time in ms, set of loaded top-level packages, locale)
+    """
+    result = _run(["-X", "importtime", "-c",
+                   f"import json, locale, sys; import {module}; "
+                   "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules}))); "
+                   "print(locale.setlocale(locale.LC_ALL))"])
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.strip() == module:
+            cumulative = int(cumulative_us) / 1000
+    loaded_line, locale_line = result.stdout.strip().splitlines()[-2:]
+    return cumulative, set(json.loads(loaded_line)), locale_line
+
+
+class StartupTest(unittest.TestCase):
+    def test_modules_defer_heavy_imports(self):
+        for module in MODULES:
+            with self.subTest(module=module):
+                _, loaded, _ = import_profile(module)
+                self.assertFalse(loaded & set(DEFERRED),
+                                 f"importing {module} loads {sorted(loaded & set(DEFERRED))}")
+
+    def test_import_has_no_locale_side_effect(self):
+        _, _, baseline = import_profile("os")
+        for module in MODULES:
+            with self.subTest(module=module):
+                self.assertEqual(import_profile(module)[2], baseline)
+
+    def test_import_time_budget(self):
+        for module in MODULES:
+            with self.subTest(module=module):
+                cumulative, _, _ = import_profile(module)
+                self.assertLess(cumulative, IMPORT_BUDGET_MS,
+                                f"importing {module} took {cumulative:.1f} ms")
+
+    def test_cli_help_budget(self):
+        _run(["build.py", "--help"])  # warm the bytecode cache
+        start = time.perf_counter()
+        _run(["build.py", "--help"])
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertLess(elapsed, HELP_BUDGET_MS, f"build.py --help took {elapsed:.0f} ms")
+
+
+if __name__ == "__main__":
+    unittest.main()